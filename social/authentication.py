@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import ugettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .caching import CacheStats
+from .models import Account
+
+# hit and miss counters of cached users
+user_cache_stats = CacheStats()
+
+# the only fields loaded for authenticated users, others are deferred and loaded when accessed
+SNAPSHOT_FIELDS = ('id', 'username', 'is_staff', 'is_active')
+
+
+def user_cache_key(pk):
+    return 'jwt-user:{}'.format(pk)
+
+
+def forget_user(pk):
+    """Removes cached snapshot of account, so its next request loads it again"""
+
+    if settings.JWT_USER_CACHE is not None:
+        caches[settings.JWT_USER_CACHE].delete(user_cache_key(pk))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication, which keeps snapshots of users' id, username, is_staff and is_active in JWT_USER_CACHE,
+    instead of loading account on every request. Snapshots are removed when account is saved or deleted,
+    and expire after cache timeout, which bounds staleness of caches that are not shared between processes"""
+
+    def get_user(self, validated_token):
+        if settings.JWT_USER_CACHE is None:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache = caches[settings.JWT_USER_CACHE]
+        key = user_cache_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            user_cache_stats.miss('user')
+            snapshot = Account.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(
+                *SNAPSHOT_FIELDS).first()
+            if snapshot is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cache.set(key, snapshot)
+        else:
+            user_cache_stats.hit('user')
+
+        user = Account.from_db(router.db_for_read(Account), SNAPSHOT_FIELDS, snapshot)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,215 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.reverse import reverse as reverse_url
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .bot.direct import chunks
+from .latency import summarize
+from .models import Account, Like, LikeCounter, Post, VersionStamp
+from .serializers import PostSerializer
+
+ROUTES = ('posts-list', 'posts-detail', 'posts-like-post', 'accounts-read-details', 'token_obtain_pair',
+          'posts-search')
+
+# how links of serialized posts are made: resolved for every row, built from precompiled url parts,
+# or left out of rows in favour of URI templates in paginated response
+SERIALIZATION_MODES = ('reverse', 'builder', 'template')
+
+# words of seeded posts' contents, and of search queries
+VOCABULARY = tuple('term{}'.format(i) for i in range(1000))
+
+
+class Dataset:
+    """Seeded accounts and posts, with cumulative weights of posts, so popular posts are read and liked more"""
+
+    def __init__(self, accounts, posts, password, skew):
+        self.accounts = accounts
+        self.posts = posts
+        self.password = password
+        self.cumulative_weights = []
+        total = 0
+        for rank in range(len(posts)):
+            total += 1 / (rank + 1) ** skew
+            self.cumulative_weights.append(total)
+        self.tokens = {}
+
+    def popular_post(self, rng):
+        return rng.choices(self.posts, cum_weights=self.cumulative_weights)[0]
+
+    def token(self, account):
+        if account.pk not in self.tokens:
+            self.tokens[account.pk] = str(AccessToken.for_user(account))
+        return self.tokens[account.pk]
+
+
+def bulk_create(model, objects, batch_size):
+    for chunk in chunks(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(chunk, batch_size=batch_size)
+
+
+def seed(number_of_users, posts_per_user, number_of_likes, skew, rng, batch_size=1000):
+    """Creates users with the same password, posts_per_user posts per user, and up to number_of_likes likes,
+    where post of rank k gets likes in proportion to 1 / k ** skew"""
+
+    prefix = 'benchmark-{}-'.format(uuid.uuid4().hex[:8])
+    password = uuid.uuid4().hex
+    password_hash = make_password(password)
+
+    accounts = [Account(username=prefix + str(i), email=prefix + str(i) + '@example.com', password=password_hash)
+                for i in range(number_of_users)]
+    bulk_create(Account, accounts, batch_size)
+
+    posts = [Post(author_id=account.pk, post_title='{}{}-{}'.format(prefix, account.pk, i),
+                  post_content=' '.join(rng.choices(VOCABULARY, k=30)))
+             for account in accounts for i in range(posts_per_user)]
+    rng.shuffle(posts)
+    bulk_create(Post, posts, batch_size)
+
+    dataset = Dataset(accounts, posts, password, skew)
+    likes = set()
+    if posts and len(accounts) > 1:
+        for _ in range(number_of_likes):
+            post = dataset.popular_post(rng)
+            account = rng.choice(accounts)
+            if account.pk != post.author_id:
+                likes.add((post.pk, account.pk))
+    like_objects = [Like(related_post_id=post_pk, related_user_id=user_pk) for post_pk, user_pk in likes]
+    bulk_create(Like, like_objects, batch_size)
+    LikeCounter.objects.count_likes(like_objects, batch_size)
+    VersionStamp.objects.bump([VersionStamp.ALL])
+    return dataset
+
+
+def build_request(route, dataset, rng):
+    """Returns (method, path, data, account to authenticate as, or None) for one request to route"""
+
+    if route == 'posts-list':
+        return 'get', reverse('posts-list'), None, None
+    if route == 'posts-detail':
+        return 'get', reverse('posts-detail', args=[dataset.popular_post(rng).pk]), None, None
+    if route == 'posts-like-post':
+        post = dataset.popular_post(rng)
+        return 'post', reverse('posts-like-post', args=[post.pk]), None, rng.choice(dataset.accounts)
+    if route == 'accounts-read-details':
+        return 'get', reverse('accounts-read-details', args=[rng.choice(dataset.accounts).pk]), None, None
+    if route == 'posts-search':
+        return 'get', reverse('posts-search'), {'q': rng.choice(VOCABULARY)}, None
+    if route == 'token_obtain_pair':
+        return 'post', reverse('token_obtain_pair'), {'username': rng.choice(dataset.accounts).username,
+                                                      'password': dataset.password}, None
+    raise ValueError('Unknown route ' + route)
+
+
+class RouteResult:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.status_codes = Counter()
+        self.elapsed = 0
+
+    def as_dict(self):
+        result = summarize(self.latencies, self.elapsed)
+        if self.queries:
+            result['queries_per_request'] = round(sum(self.queries) / len(self.queries), 2)
+        result['status_codes'] = {str(code): number for code, number in sorted(self.status_codes.items())}
+        return result
+
+
+def run_in_process(route, dataset, number_of_requests, rng):
+    """Sends requests through Django test client, one at a time, counting database queries of every request"""
+
+    client = Client()
+    result = RouteResult()
+    start = time.perf_counter()
+    for _ in range(number_of_requests):
+        method, path, data, account = build_request(route, dataset, rng)
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + dataset.token(account)} if account else {}
+        with CaptureQueriesContext(connection) as queries:
+            request_start = time.perf_counter()
+            response = getattr(client, method)(path, data, **headers)
+            result.latencies.append(time.perf_counter() - request_start)
+        result.queries.append(len(queries))
+        result.status_codes[response.status_code] += 1
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_over_http(route, dataset, number_of_requests, rng, base_url, concurrency):
+    """Sends requests to running server, from pool of concurrency threads"""
+
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_maxsize=concurrency))
+    planned = []
+    for _ in range(number_of_requests):
+        method, path, data, account = build_request(route, dataset, rng)
+        headers = {'Authorization': 'Bearer ' + dataset.token(account)} if account else {}
+        planned.append((method, base_url.rstrip('/') + path, data, headers))
+
+    def send(request):
+        method, url, data, headers = request
+        request_start = time.perf_counter()
+        response = session.request(method, url, data=data, headers=headers)
+        return time.perf_counter() - request_start, response.status_code
+
+    result = RouteResult()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, status_code in executor.map(send, planned):
+            result.latencies.append(latency)
+            result.status_codes[status_code] += 1
+    result.elapsed = time.perf_counter() - start
+    session.close()
+    return result
+
+
+def run(routes, dataset, number_of_requests, rng, base_url=None, concurrency=1, warmup=10):
+    """Runs warmup and measured requests for every route, and returns {route: results}"""
+
+    results = {}
+    for route in routes:
+        if base_url:
+            run_over_http(route, dataset, warmup, rng, base_url, concurrency)
+            results[route] = run_over_http(route, dataset, number_of_requests, rng, base_url, concurrency).as_dict()
+        else:
+            run_in_process(route, dataset, warmup, rng)
+            results[route] = run_in_process(route, dataset, number_of_requests, rng).as_dict()
+    return results
+
+
+class ReversePostSerializer(PostSerializer):
+    """PostSerializer which resolves url of every link of every row with reverse(), as a baseline"""
+
+    def link(self, field, obj):
+        return reverse_url(self.link_fields[field], args=[obj.pk], request=self.context['request'])
+
+
+def measure_serialization(number_of_rows, repeat=5):
+    """Serializes page of number_of_rows posts, already loaded, in every serialization mode, and returns
+    {mode: microseconds per row}, the best of repeat runs"""
+
+    posts = list(Post.objects.with_fields(None).select_related('author').order_by('pk')[:number_of_rows])
+    request = Request(RequestFactory().get(reverse('posts-list')))
+    results = {}
+    for mode in SERIALIZATION_MODES:
+        serializer_class = ReversePostSerializer if mode == 'reverse' else PostSerializer
+        best = None
+        for _ in range(repeat):
+            context = {'request': request, 'link_templates': mode == 'template'}
+            start = time.perf_counter()
+            serializer_class(posts, many=True, context=context).data
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[mode] = {'rows': len(posts), 'us_per_row': round(best / len(posts) * 10 ** 6, 2) if posts else None}
+    return results
@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from ..models import Account, Like, LikeCounter, Post, VersionStamp
+from .records import Post as PostRecord, User
+from .scheduler import LikeScheduler
+
+
+def unique(value, used):
+    """Returns value, or value with numeric suffix if value is already used, and marks it as used"""
+
+    candidate = value
+    suffix = 1
+    while candidate in used:
+        suffix += 1
+        candidate = '{}{}'.format(value, suffix)
+    used.add(candidate)
+    return candidate
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class DirectLoader:
+    """Plans whole bot workload in memory, with the same rules as bot's like(),
+    and inserts it with bulk_create, without going through the API"""
+
+    def __init__(self, faker, rng, batch_size=1000, processes=None):
+        self.faker = faker
+        self.random = rng
+        self.batch_size = batch_size
+        self.processes = processes or os.cpu_count()
+
+    def plan(self, number_of_users, max_posts_per_user, max_likes_per_user):
+        """Returns list of users with their posts, and list of (user, post) likes"""
+
+        usernames = set(Account.objects.values_list('username', flat=True))
+        titles = set(Post.objects.values_list('post_title', flat=True))
+
+        users = []
+        for _ in range(number_of_users):
+            user = User(unique(self.faker.user_name(), usernames), self.faker.password(), self.faker.email())
+            if max_posts_per_user > 1:
+                for _ in range(self.random.randrange(1, max_posts_per_user)):
+                    user.posts.append(PostRecord(unique(self.faker.sentence(), titles), self.faker.text(), user, ''))
+            users.append(user)
+
+        likes = []
+        if max_likes_per_user != 0:
+            likes = list(LikeScheduler(users, max_likes_per_user, rng=self.random).plan())
+        return users, likes
+
+    def hash_passwords(self, users):
+        """Hashes users' passwords in pool of processes"""
+
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            passwords = [user.password for user in users]
+            chunksize = max(len(passwords) // (self.processes * 4), 1)
+            return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+    def load(self, users, likes):
+        """Inserts planned users, posts and likes, committing every batch_size rows"""
+
+        accounts = [Account(username=user.username, email=user.email, password=password)
+                    for user, password in zip(users, self.hash_passwords(users))]
+        self.bulk_create(Account, accounts)
+        for user, account in zip(users, accounts):
+            user.pk = account.pk
+
+        posts = [post for user in users for post in user.posts]
+        post_objects = [Post(author_id=post.user.pk, post_title=post.title, post_content=post.content)
+                        for post in posts]
+        self.bulk_create(Post, post_objects)
+        for post, post_object in zip(posts, post_objects):
+            post.pk = post_object.pk
+
+        like_objects = [Like(related_post_id=post.pk, related_user_id=user.pk) for user, post in likes]
+        self.bulk_create(Like, like_objects)
+        LikeCounter.objects.count_likes(like_objects, self.batch_size)
+        VersionStamp.objects.bump([VersionStamp.ALL])
+        return len(accounts), len(post_objects), len(likes)
+
+    def bulk_create(self, model, objects):
+        for chunk in chunks(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.batch_size)
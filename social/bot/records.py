@@ -0,0 +1,36 @@
+class User:
+    __slots__ = ('pk', 'username', 'password', 'email', 'posts', 'likes', 'liked_posts', 'can_like', 'zero_likes',
+                 'token', 'refresh_token', 'token_expires')
+
+    def __init__(self, username, password, email=''):
+        self.pk = None
+        self.username = username
+        self.password = password
+        self.email = email
+        self.posts = []
+        self.likes = 0
+        self.liked_posts = set()
+        self.can_like = True
+        self.zero_likes = 0
+        self.token = ''
+        self.refresh_token = ''
+        self.token_expires = 0
+
+    def __str__(self):
+        return self.username
+
+
+class Post:
+    __slots__ = ('pk', 'user', 'title', 'content', 'likes_number', 'like_link', 'position')
+
+    def __init__(self, title, content, user, link):
+        self.pk = None
+        self.user = user
+        self.title = title
+        self.content = content
+        self.likes_number = 0
+        self.like_link = link
+        self.position = -1
+
+    def __str__(self):
+        return self.title
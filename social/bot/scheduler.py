@@ -0,0 +1,128 @@
+import heapq
+import random
+
+
+class CandidatePosts:
+    """Posts of all authors who have at least one post with 0 likes.
+    Posts are kept in flat list, so random post can be drawn in O(1), and author is removed in O(his posts)"""
+
+    def __init__(self, users):
+        self.posts = []
+        for user in users:
+            if user.zero_likes > 0:
+                self.add_author(user)
+
+    def __len__(self):
+        return len(self.posts)
+
+    def add_author(self, user):
+        for post in user.posts:
+            post.position = len(self.posts)
+            self.posts.append(post)
+
+    def remove_author(self, user):
+        for post in user.posts:
+            last = self.posts.pop()
+            if last is not post:
+                last.position = post.position
+                self.posts[post.position] = last
+            post.position = -1
+
+    def random_post(self, rng):
+        return self.posts[int(rng.random() * len(self.posts))]
+
+
+class LikeScheduler:
+    """Plans likes by the rules of social_bot like():
+    Next user to perform a like is the user who has most posts and has not reached max likes.
+    User can only like random posts from users who have at least one post with 0 likes,
+    users cannot like their own posts, and one user can like a certain post only once.
+    If there is no posts with 0 likes, scheduler stops.
+
+    Users are kept in max-heap keyed by number of posts, and candidate posts in CandidatePosts index,
+    so each like is planned in constant time, instead of scanning all users and posts"""
+
+    # number of random draws, per wanted like, before falling back to listing all candidate posts
+    draws_per_like = 8
+
+    def __init__(self, users, max_likes_per_user, rng=None):
+        self.max_likes_per_user = max_likes_per_user
+        self.random = rng or random.Random()
+
+        for user in users:
+            user.zero_likes = sum(1 for post in user.posts if post.likes_number == 0)
+
+        # ties are broken by sign up order, like in linear scan of created users
+        self.heap = [(-len(user.posts), order, user) for order, user in enumerate(users)]
+        heapq.heapify(self.heap)
+        self.candidates = CandidatePosts(users)
+
+    def can_like(self, user):
+        return user.can_like and user.likes < self.max_likes_per_user
+
+    def next_turn(self):
+        """Returns next user to perform likes, and list of posts for him to like,
+        or None if all users have reached max likes, or there are no posts with 0 likes"""
+
+        while self.heap:
+            user = self.heap[0][2]
+            if not self.can_like(user):
+                heapq.heappop(self.heap)
+                continue
+
+            own_candidates = len(user.posts) if user.zero_likes > 0 else 0
+            if len(self.candidates) - own_candidates == 0:
+                return None
+
+            posts = self.choose_posts(user, self.max_likes_per_user - user.likes)
+            if posts:
+                return user, posts
+
+            # user has already liked all posts he can like
+            user.can_like = False
+        return None
+
+    def choose_posts(self, user, number_of_posts):
+        """Returns up to number_of_posts distinct random candidate posts, which user can like"""
+
+        chosen = []
+        candidates = self.candidates.posts
+        random_number = self.random.random
+        liked_posts = user.liked_posts
+        for _ in range(self.draws_per_like * number_of_posts):
+            post = candidates[int(random_number() * len(candidates))]
+            if post.user is not user and post not in liked_posts and post not in chosen:
+                chosen.append(post)
+                if len(chosen) == number_of_posts:
+                    return chosen
+
+        posts = [post for post in self.candidates.posts if post.user is not user and post not in user.liked_posts]
+        return self.random.sample(posts, min(number_of_posts, len(posts)))
+
+    def complete_turn(self, user, liked_posts, failed_posts=()):
+        """Records likes performed in user's turn. Posts that could not be liked are not offered to user again"""
+
+        for post in liked_posts:
+            post.likes_number += 1
+            user.likes += 1
+            user.liked_posts.add(post)
+
+            if post.likes_number == 1:
+                author = post.user
+                author.zero_likes -= 1
+                if author.zero_likes == 0:
+                    self.candidates.remove_author(author)
+
+        user.liked_posts.update(failed_posts)
+
+    def plan(self):
+        """Generates (user, post) pairs for whole like phase, assuming every like succeeds"""
+
+        while True:
+            turn = self.next_turn()
+            if turn is None:
+                return
+            user, posts = turn
+            self.complete_turn(user, posts)
+            for post in posts:
+                yield user, post
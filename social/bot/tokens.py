@@ -0,0 +1,99 @@
+import base64
+import json
+import random
+import threading
+import time
+
+
+class TokenError(Exception):
+    """Raised when token could not be obtained or refreshed within allowed number of attempts"""
+
+
+def token_expiry(token):
+    """Returns exp claim of JWT, read without verifying signature, which is server's job"""
+
+    payload = token.split('.')[1]
+    payload += '=' * (-len(payload) % 4)
+    return json.loads(base64.urlsafe_b64decode(payload.encode()))['exp']
+
+
+class TokenManager:
+    """Keeps users' access tokens valid. Tokens are renewed through refresh endpoint shortly before they expire,
+    and users log in with password only if they have no refresh token, or it has expired.
+    Failed requests are retried with exponential backoff and full jitter, up to max_attempts times"""
+
+    def __init__(self, log_in_url, refresh_url, leeway=30, max_attempts=5, backoff=0.5, max_backoff=8, rng=None,
+                 clock=time.time, sleep=time.sleep):
+        self.log_in_url = log_in_url
+        self.refresh_url = refresh_url
+        self.leeway = leeway
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.random = rng or random.Random()
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.user_locks = {}
+
+    def headers(self, user, session):
+        """Returns Authorization header with user's access token, which is renewed if it expires within leeway"""
+
+        with self.user_lock(user):
+            if not user.token:
+                self.log_in(user, session)
+            elif self.clock() >= user.token_expires - self.leeway:
+                self.refresh(user, session)
+        return {'Authorization': 'Bearer ' + user.token}
+
+    def expire(self, user, token):
+        """Marks token as expired after server rejected it, so next headers() renews it, unless it is renewed already"""
+
+        with self.user_lock(user):
+            if user.token == token:
+                user.token_expires = 0
+
+    def log_in(self, user, session):
+        response = self.post(session, self.log_in_url, {'username': user.username, 'password': user.password})
+        if response.status_code != 200:
+            raise TokenError('Log in of {} failed with status {}'.format(user, response.status_code))
+        tokens = response.json()
+        user.refresh_token = tokens['refresh']
+        self.set_access_token(user, tokens['access'])
+
+    def refresh(self, user, session):
+        """Renews access token with refresh token, or logs in again if refresh token is rejected"""
+
+        response = self.post(session, self.refresh_url, {'refresh': user.refresh_token})
+        if response.status_code != 200:
+            self.log_in(user, session)
+            return
+        tokens = response.json()
+        # server returns new refresh token only if it rotates them
+        user.refresh_token = tokens.get('refresh', user.refresh_token)
+        self.set_access_token(user, tokens['access'])
+
+    def set_access_token(self, user, token):
+        user.token = token
+        user.token_expires = token_expiry(token)
+
+    def post(self, session, url, data):
+        """Posts data, retrying connection errors, 429 and 5xx responses. Raises TokenError if all attempts fail"""
+
+        for attempt in range(self.max_attempts):
+            try:
+                response = session.post(url, data=data)
+                if response.status_code != 429 and response.status_code < 500:
+                    return response
+                error = 'status {}'.format(response.status_code)
+            except OSError as exception:
+                error = repr(exception)
+            if attempt + 1 < self.max_attempts:
+                self.sleep(self.random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        raise TokenError('{} failed {} times, last error: {}'.format(url, self.max_attempts, error))
+
+    def user_lock(self, user):
+        with self.lock:
+            if user not in self.user_locks:
+                self.user_locks[user] = threading.Lock()
+            return self.user_locks[user]
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+from django.urls import Resolver404, resolve
+
+from ..latency import summarize
+from ..metrics import DURATION_BUCKETS, Histogram
+
+
+def endpoint_name(url):
+    """Returns url name of API endpoint, or path if url does not match any"""
+
+    path = urlsplit(url).path
+    try:
+        return resolve(path).url_name or path
+    except Resolver404:
+        return path
+
+
+class TraceRecorder:
+    """Writes requests sent by bot to JSONL file, one line per request, with its offset from start of recording,
+    user it was sent as, status and latency. Access tokens are not recorded, replay obtains its own"""
+
+    def __init__(self, file, clock=time.perf_counter):
+        self.file = file
+        self.clock = clock
+        self.start = clock()
+        self.lock = threading.Lock()
+
+    def record(self, method, url, data, user, sent_at, status_code, latency):
+        line = json.dumps({'offset': round(sent_at - self.start, 6), 'method': method.upper(), 'url': url,
+                           'data': data, 'user': user.username if user else None, 'endpoint': endpoint_name(url),
+                           'status': status_code, 'latency': round(latency, 6)})
+        with self.lock:
+            self.file.write(line + '\n')
+
+
+def read_trace(file):
+    """Returns recorded requests, ordered by offset"""
+
+    return sorted((json.loads(line) for line in file if line.strip()), key=lambda record: record['offset'])
+
+
+def credentials(records):
+    """Returns {username: password} of users who signed up or logged in in recorded requests"""
+
+    return {record['data']['username']: record['data']['password'] for record in records
+            if record['method'] == 'POST' and isinstance(record['data'], dict) and 'password' in record['data']
+            and 'username' in record['data']}
+
+
+def schedule(records, rate=None, speed=1.0):
+    """Returns offsets at which requests are sent: evenly spaced at rate requests per second if rate is given,
+    else recorded offsets divided by speed"""
+
+    if rate:
+        return [index / rate for index in range(len(records))]
+    return [record['offset'] / speed for record in records]
+
+
+def rebase(url, base_url):
+    """Returns url with scheme and host of base_url"""
+
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    return urlunsplit((base.scheme, base.netloc) + tuple(urlsplit(url)[2:]))
+
+
+class ReplayResult:
+    """Service time, measured from actual send, and response time, measured from scheduled send, of requests
+    to one endpoint. Response time includes waiting for free worker, so it is corrected for coordinated omission"""
+
+    def __init__(self):
+        self.service_times = []
+        self.response_times = []
+        self.histogram = Histogram(DURATION_BUCKETS)
+        self.status_codes = Counter()
+        self.errors = 0
+
+    def add(self, status_code, scheduled_at, sent_at, done_at):
+        self.service_times.append(done_at - sent_at)
+        self.response_times.append(done_at - scheduled_at)
+        self.histogram.observe(done_at - scheduled_at)
+        self.status_codes[status_code or 'error'] += 1
+        if status_code is None or status_code >= 400:
+            self.errors += 1
+
+    def as_dict(self, elapsed):
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip(self.histogram.buckets + ('+Inf',), self.histogram.counts):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+        requests = len(self.response_times)
+        return {
+            'requests': requests,
+            'errors': self.errors,
+            'error_rate': round(self.errors / requests, 4) if requests else None,
+            'status_codes': {str(code): number for code, number in sorted(self.status_codes.items(), key=str)},
+            'service_time': summarize(self.service_times, elapsed),
+            'response_time': summarize(self.response_times, elapsed),
+            'response_time_histogram': histogram,
+        }
+
+
+def replay(records, offsets, send, concurrency, clock=time.perf_counter, sleep=time.sleep):
+    """Sends records at given offsets from pool of concurrency threads, without waiting for responses,
+    and returns ({endpoint: result}, elapsed seconds). send(record) returns status code, or raises exception"""
+
+    def timed(record):
+        sent_at = clock()
+        try:
+            status_code = send(record)
+        except Exception:
+            status_code = None
+        return status_code, sent_at, clock()
+
+    start = clock()
+    scheduled = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record, offset in zip(records, offsets):
+            delay = start + offset - clock()
+            if delay > 0:
+                sleep(delay)
+            scheduled.append((record, start + offset, executor.submit(timed, record)))
+
+        results = defaultdict(ReplayResult)
+        for record, scheduled_at, future in scheduled:
+            status_code, sent_at, done_at = future.result()
+            results[record['endpoint']].add(status_code, scheduled_at, sent_at, done_at)
+    return dict(results), clock() - start
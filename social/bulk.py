@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .exceptions import PostTitleAlreadyExists
+from .models import Like, Post, VersionStamp
+from .serializers import LikeSerializer, PostSerializer
+
+# times posts are inserted again, when other request inserted post with the same title in the meantime
+MAX_TITLE_CONFLICTS = 3
+
+
+def parse_items(request):
+    """Returns items of bulk request, which must be JSON array of 1 to BULK_MAX_ITEMS objects, or raises 400"""
+
+    items = request.data
+    if not isinstance(items, list):
+        raise ValidationError({'error': 'Request body must be JSON array'})
+    if not 0 < len(items) <= settings.BULK_MAX_ITEMS:
+        raise ValidationError({'error': 'Request must have from 1 to {} items'.format(settings.BULK_MAX_ITEMS)})
+    if not all(isinstance(item, dict) for item in items):
+        raise ValidationError({'error': 'Every item must be JSON object'})
+    return items
+
+
+def created(data):
+    return {'status': status.HTTP_201_CREATED, 'data': data}
+
+
+def failed(status_code, errors):
+    return {'status': status_code, 'errors': errors}
+
+
+def bulk_response(results):
+    """Returns results in order of items, with 201 if all items were created, else with 207 Multi-Status"""
+
+    if all(result['status'] == status.HTTP_201_CREATED for result in results):
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+    return Response({'results': results}, status=status.HTTP_207_MULTI_STATUS)
+
+
+def create_posts(items, user, context):
+    """Validates items with PostSerializer, and creates valid posts with unique titles with bulk_create,
+    in one transaction. Returns result of every item"""
+
+    results = [None] * len(items)
+    titles = {}
+    for index, item in enumerate(items):
+        serializer = PostSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results[index] = failed(status.HTTP_400_BAD_REQUEST, serializer.errors)
+        elif serializer.validated_data['post_title'] in titles:
+            results[index] = failed(status.HTTP_400_BAD_REQUEST, {'post_title': [
+                'Duplicate of item {}'.format(titles[serializer.validated_data['post_title']])]})
+        else:
+            titles[serializer.validated_data['post_title']] = index
+            results[index] = serializer.validated_data
+
+    for attempt in range(MAX_TITLE_CONFLICTS):
+        try:
+            posts = insert_posts(titles, results, user)
+            break
+        except IntegrityError:
+            # other request created post with one of the titles after they were checked
+            if attempt == MAX_TITLE_CONFLICTS - 1:
+                raise
+
+    for index, post in posts.items():
+        # new post has no likes, serializer does not have to count them
+        post.likes_number = 0
+        results[index] = created(PostSerializer(post, context=context).data)
+    return results
+
+
+def insert_posts(titles, results, user):
+    """Marks items, whose titles already exist, as failed, and inserts the rest. Returns {item index: created post}"""
+
+    with transaction.atomic(using=router.db_for_write(Post)):
+        for title in Post.objects.filter(post_title__in=list(titles)).values_list('post_title', flat=True):
+            results[titles.pop(title)] = failed(status.HTTP_400_BAD_REQUEST,
+                                                {'post_title': [PostTitleAlreadyExists.default_detail]})
+
+        posts = {index: Post(author=user, **results[index]) for index in titles.values()}
+        Post.objects.bulk_create(posts.values())
+        if posts:
+            VersionStamp.objects.bump([VersionStamp.POSTS, VersionStamp.account_key(user.pk)] +
+                                      [VersionStamp.post_key(post.pk) for post in posts.values()])
+    return posts
+
+
+def post_pk(item):
+    """Returns valid pk of related_post of item, or None"""
+
+    value = item.get('related_post')
+    if isinstance(value, bool):
+        return None
+    try:
+        pk = int(value)
+    except (TypeError, ValueError):
+        return None
+    return pk if 0 < pk < 2 ** 31 else None
+
+
+def like_posts(items, user, context):
+    """Likes related_post of every item with single INSERT, skipping posts which user can not like.
+    Results of skipped items tell why, like single like does. Returns result of every item"""
+
+    results = [None] * len(items)
+    post_pks = {}
+    for index, item in enumerate(items):
+        pk = post_pk(item)
+        if pk is None:
+            results[index] = failed(status.HTTP_400_BAD_REQUEST, {'related_post': ['A valid post id is required.']})
+        elif pk in post_pks:
+            results[index] = failed(status.HTTP_400_BAD_REQUEST,
+                                    {'related_post': ['Duplicate of item {}'.format(post_pks[pk])]})
+        else:
+            post_pks[pk] = index
+
+    likes = Like.objects.like_many(post_pks, user) if post_pks else {}
+    for pk, like in likes.items():
+        results[post_pks.pop(pk)] = created(LikeSerializer(like, context=context).data)
+
+    authors = dict(Post.objects.filter(pk__in=list(post_pks)).values_list('pk', 'author_id'))
+    for pk, index in post_pks.items():
+        if pk not in authors:
+            results[index] = failed(status.HTTP_404_NOT_FOUND, {'error': 'Not found.'})
+        elif authors[pk] == user.pk:
+            results[index] = failed(status.HTTP_405_METHOD_NOT_ALLOWED, {'error': 'You can not like your own post'})
+        else:
+            results[index] = failed(status.HTTP_405_METHOD_NOT_ALLOWED, {'error': 'Already liked this post'})
+    return results
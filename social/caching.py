@@ -0,0 +1,33 @@
+import threading
+from collections import Counter
+
+
+class CacheStats:
+    """Thread safe hit and miss counters of cache, per kind of cached value"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def hit(self, kind):
+        with self.lock:
+            self.hits[kind] += 1
+
+    def miss(self, kind):
+        with self.lock:
+            self.misses[kind] += 1
+
+    def as_dict(self):
+        """Returns {kind: {'hits': number, 'misses': number, 'hit_rate': ratio}}"""
+
+        with self.lock:
+            kinds = set(self.hits) | set(self.misses)
+            return {kind: {'hits': self.hits[kind], 'misses': self.misses[kind],
+                           'hit_rate': self.hits[kind] / (self.hits[kind] + self.misses[kind])}
+                    for kind in kinds}
+
+    def reset(self):
+        with self.lock:
+            self.hits.clear()
+            self.misses.clear()
@@ -0,0 +1,102 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import CacheStats
+from .models import VersionStamp
+
+# hit and miss counters of response cache, per url name
+response_cache_stats = CacheStats()
+
+
+class ConditionalGetMixin:
+    """Answers GET requests of list and retrieve with 304 Not Modified, if If-None-Match or If-Modified-Since
+    match version stamp of the response, without running the queryset.
+    Responses of actions listed in cached_actions are cached under current version, so any change visible
+    in them makes new requests miss the cache.
+    Views set collection_version_key, and object_version_key, a function of object pk. Views whose objects
+    show data of related objects set object_related_version_keys, a function of object pk returning subquery
+    of keys of those objects"""
+
+    collection_version_key = None
+    object_version_key = None
+    object_related_version_keys = None
+    cached_actions = ()
+    # set when response data depends on requesting user, so it is cached, and its etag is, per user
+    cache_per_user = False
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.collection_version_key, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(self.get_object_version_key(), super().retrieve, request, *args,
+                                         related_keys=self.get_object_related_version_keys(), **kwargs)
+
+    def get_object_version_key(self):
+        return self.object_version_key(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+
+    def get_object_related_version_keys(self):
+        """Returns subquery of keys of objects shown with the object, or None if pk is not a valid id"""
+
+        if self.object_related_version_keys is None:
+            return None
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            return None
+        return self.object_related_version_keys(pk) if 0 < pk < 2 ** 31 else None
+
+    def conditional_response(self, key, view, request, *args, related_keys=None, **kwargs):
+        """Returns 304 if request validators match current version of key and of related_keys, else response of view
+        with validators, taken from response cache if possible"""
+
+        version, modified = VersionStamp.objects.current(key, related_keys)
+        # modification time keeps etags unique if stamps are ever reset, e.g. when database is restored
+        etag = '{}:{}:{}'.format(key, version, int(modified.timestamp() * 1000000) if modified else 0)
+        if self.cache_per_user and request.user.is_authenticated:
+            etag += ':user:{}'.format(request.user.pk)
+        etag = '"{}"'.format(etag)
+        last_modified = int(modified.timestamp()) if modified else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = self.cached_response(etag, view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def cached_response(self, etag, view, request, *args, **kwargs):
+        """Returns response with data cached under etag, request path with query, renderer and user,
+        or response of view, whose data is cached if it is successful"""
+
+        if settings.RESPONSE_CACHE is None or self.action not in self.cached_actions:
+            return view(request, *args, **kwargs)
+
+        cache = caches[settings.RESPONSE_CACHE]
+        kind = request.resolver_match.url_name
+        key = self.response_cache_key(etag, request)
+        data = cache.get(key)
+        if data is not None:
+            response_cache_stats.hit(kind)
+            return Response(data)
+        response_cache_stats.miss(kind)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        return response
+
+    def response_cache_key(self, etag, request):
+        user = request.user.pk if self.cache_per_user else request.user.is_authenticated
+        # responses carry absolute links, so they are cached per scheme and host too
+        value = '{}|{}|{}|{}'.format(etag, request.build_absolute_uri(), request.accepted_renderer.format, user)
+        return 'response:{}'.format(hashlib.md5(value.encode()).hexdigest())
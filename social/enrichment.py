@@ -0,0 +1,199 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import clearbit
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from pyhunter import PyHunter
+
+from .caching import CacheStats
+from .models import Account, EnrichmentJob
+
+# hit and miss counters of cached providers
+cache_stats = CacheStats()
+
+MISSING = object()
+
+
+class HunterVerifier:
+    """Uses pyhunter to check if email is valid"""
+
+    def __init__(self):
+        self.hunter = PyHunter(api_key=settings.HUNTER_API_KEY)
+
+    def verify(self, email):
+        """Returns (deliverable, domain_deliverable), where domain_deliverable is False if domain has no mail server,
+        True if it accepts all emails, and None if hunter could not tell.
+        Raises exception if hunter could not be reached"""
+
+        # NOTE if it is not working, it is because i have reached the limit for the number of verification requests per domain
+        # to solve it temporarily, just change email domain to a different one
+        data = self.hunter.email_verifier(email)
+        domain_deliverable = None
+        if not data.get('mx_records', True):
+            domain_deliverable = False
+        elif data.get('accept_all'):
+            domain_deliverable = True
+        return data['result'] != 'undeliverable', domain_deliverable
+
+
+class ClearbitEnricher:
+    """Uses clearbit to enrich user data"""
+
+    def __init__(self):
+        clearbit.key = settings.CLEARBIT_KEY
+
+    def enrich(self, email):
+        return clearbit.Enrichment.find(email=email, stream=True)
+
+
+class FakeProvider:
+    """Offline verifier and enricher. Emails from reserved .invalid domains are undeliverable"""
+
+    def verify(self, email):
+        if email.endswith('.invalid'):
+            return False, False
+        return True, None
+
+    def enrich(self, email):
+        return {'email': email, 'provider': 'fake'}
+
+
+class CachedVerifier:
+    """Caches verifier results per email, and per domain, when verifier could tell that whole domain is deliverable
+    or not. Undeliverable results are kept for shorter time, given in ENRICHMENT_CACHE_TTL"""
+
+    def __init__(self, verifier, cache, stats):
+        self.verifier = verifier
+        self.cache = cache
+        self.stats = stats
+
+    def verify(self, email):
+        email = email.lower()
+        domain = email.rsplit('@', 1)[-1]
+        email_key = cache_key('verdict', email)
+        domain_key = cache_key('domain', domain)
+
+        cached = self.cache.get_many([email_key, domain_key])
+        if email_key in cached:
+            self.stats.hit('email')
+            return cached[email_key]
+        self.stats.miss('email')
+
+        if domain_key in cached:
+            self.stats.hit('domain')
+            return cached[domain_key], cached[domain_key]
+        self.stats.miss('domain')
+
+        deliverable, domain_deliverable = self.verifier.verify(email)
+        self.cache.set(email_key, (deliverable, domain_deliverable), cache_ttl('email' if deliverable else 'negative'))
+        if domain_deliverable is not None:
+            self.cache.set(domain_key, domain_deliverable, cache_ttl('domain' if domain_deliverable else 'negative'))
+        return deliverable, domain_deliverable
+
+
+class CachedEnricher:
+    """Caches enricher results per email. Emails without data are kept for shorter time"""
+
+    def __init__(self, enricher, cache, stats):
+        self.enricher = enricher
+        self.cache = cache
+        self.stats = stats
+
+    def enrich(self, email):
+        key = cache_key('details', email.lower())
+        cached = self.cache.get(key, MISSING)
+        if cached is not MISSING:
+            self.stats.hit('details')
+            return cached
+        self.stats.miss('details')
+
+        details = self.enricher.enrich(email)
+        self.cache.set(key, details, cache_ttl('email' if details else 'negative'))
+        return details
+
+
+def cache_key(kind, value):
+    return 'enrichment:{}:{}'.format(kind, hashlib.md5(value.encode()).hexdigest())
+
+
+def cache_ttl(kind):
+    return settings.ENRICHMENT_CACHE_TTL[kind]
+
+
+def get_verifier():
+    verifier = import_string(settings.ENRICHMENT_VERIFIER)()
+    if settings.ENRICHMENT_CACHE is None:
+        return verifier
+    return CachedVerifier(verifier, caches[settings.ENRICHMENT_CACHE], cache_stats)
+
+
+def get_enricher():
+    enricher = import_string(settings.ENRICHMENT_ENRICHER)()
+    if settings.ENRICHMENT_CACHE is None:
+        return enricher
+    return CachedEnricher(enricher, caches[settings.ENRICHMENT_CACHE], cache_stats)
+
+
+def enrich(email, verifier, enricher):
+    """Verifies and enriches email. Returns (status, user_details), or raises exception if provider failed"""
+
+    deliverable, domain_deliverable = verifier.verify(email)
+    if not deliverable:
+        return Account.ENRICHMENT_REJECTED, None
+    return Account.ENRICHMENT_DONE, enricher.enrich(email)
+
+
+def claim_jobs(batch_size):
+    """Marks up to batch_size jobs, which are queued or whose worker stopped responding, as running and returns them.
+    Rows locked by other workers are skipped, so many workers can run at the same time"""
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.ENRICHMENT_JOB_TIMEOUT)
+    with transaction.atomic():
+        jobs = EnrichmentJob.objects.select_for_update(skip_locked=True, of=('self',)).select_related('account')
+        jobs = jobs.filter(Q(status=EnrichmentJob.QUEUED, run_after__lte=now) |
+                           Q(status=EnrichmentJob.RUNNING, date_time_updated__lt=stale))
+        jobs = list(jobs.order_by('run_after')[:batch_size])
+        EnrichmentJob.objects.filter(pk__in=[job.pk for job in jobs]).update(status=EnrichmentJob.RUNNING,
+                                                                           date_time_updated=now)
+    return jobs
+
+
+def run_jobs(jobs, verifier, enricher, concurrency):
+    """Runs verification and enrichment of jobs in pool of concurrency threads, and saves results.
+    Failed jobs are retried with exponential backoff, until ENRICHMENT_MAX_ATTEMPTS"""
+
+    def run(job):
+        try:
+            return enrich(job.account.email, verifier, enricher), None
+        except Exception as error:
+            return None, error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run, jobs))
+
+    for job, (result, error) in zip(jobs, results):
+        job.attempts += 1
+        account = job.account
+        if error is None:
+            job.status = EnrichmentJob.DONE
+            account.enrichment_status, account.user_details = result
+            account.is_active = account.enrichment_status != Account.ENRICHMENT_REJECTED
+        elif job.attempts < settings.ENRICHMENT_MAX_ATTEMPTS:
+            job.status = EnrichmentJob.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=2 ** job.attempts)
+            job.error = repr(error)
+        else:
+            job.status = EnrichmentJob.FAILED
+            job.error = repr(error)
+            account.enrichment_status = Account.ENRICHMENT_FAILED
+
+        with transaction.atomic():
+            job.save()
+            account.save(update_fields=['enrichment_status', 'user_details', 'is_active'])
@@ -0,0 +1,70 @@
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Account, Like, Post
+
+# exported fields, and field compared with since timestamp, of every kind. Likes have no timestamp,
+# and are exported incrementally by pk only
+EXPORTS = {
+    'posts': (Post, ('id', 'author_id', 'post_title', 'post_content', 'date_time_created'), 'date_time_created'),
+    'likes': (Like, ('id', 'related_post_id', 'related_user_id'), None),
+    'accounts': (Account, ('id', 'username', 'first_name', 'last_name', 'email', 'date_joined', 'is_active',
+                           'enrichment_status'), 'date_joined'),
+}
+
+
+def parse_since(value):
+    """Returns aware datetime from ISO 8601 value, or raises ValueError"""
+
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError('since must be ISO 8601 date and time')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_rows(kind, since_pk=None, since=None, chunk_size=2000):
+    """Returns iterator over dicts of rows of kind, ordered by pk, with pk greater than since_pk,
+    and created after since. Rows are fetched chunk_size at a time through server-side cursor"""
+
+    if kind not in EXPORTS:
+        raise ValueError('kind must be one of ' + ', '.join(sorted(EXPORTS)))
+    model, fields, timestamp_field = EXPORTS[kind]
+
+    queryset = model.objects.order_by('pk')
+    if since_pk is not None:
+        queryset = queryset.filter(pk__gt=since_pk)
+    if since is not None:
+        if timestamp_field is None:
+            raise ValueError('{} can be exported since pk only'.format(kind))
+        queryset = queryset.filter(**{timestamp_field + '__gt': since})
+    return queryset.values(*fields).iterator(chunk_size=chunk_size)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield (json.dumps(row, cls=DjangoJSONEncoder) + '\n').encode()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compresses chunks of bytes into gzip stream, yielding compressed data as it becomes available"""
+
+    # wbits 31 writes gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, since_pk=None, since=None, compress=False, chunk_size=2000):
+    """Returns iterator over chunks of NDJSON export of kind, gzip compressed if compress is True"""
+
+    lines = ndjson_lines(export_rows(kind, since_pk, since, chunk_size))
+    return gzip_chunks(lines) if compress else lines
@@ -0,0 +1,26 @@
+import math
+
+
+def percentile(sorted_values, q):
+    """Returns q-th percentile (0-100) of sorted values, using nearest rank method"""
+
+    if not sorted_values:
+        return None
+    rank = max(int(math.ceil(q / 100 * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """Returns number of requests, throughput per second and latency percentiles in milliseconds,
+    for latencies in seconds, measured during elapsed seconds"""
+
+    values = sorted(latencies)
+    summary = {
+        'requests': len(values),
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed else None,
+    }
+    for name, q in (('p50_ms', 50), ('p95_ms', 95), ('p99_ms', 99), ('max_ms', 100)):
+        value = percentile(values, q)
+        summary[name] = round(value * 1000, 3) if value is not None else None
+    summary['mean_ms'] = round(sum(values) / len(values) * 1000, 3) if values else None
+    return summary
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.urls import get_script_prefix, reverse
+
+# put in place of pk when url is reversed once, and replaced with pk of every object
+PK_SENTINEL = 'pk-sentinel'
+
+LINKS_QUERY_PARAM = 'links'
+LINK_TEMPLATES = 'template'
+
+
+@lru_cache(maxsize=None)
+def path_parts(url_name, script_prefix):
+    """Returns path of url_name, reversed once per url name and script prefix, split around object's pk"""
+
+    prefix, suffix = reverse(url_name, args=[PK_SENTINEL]).split(PK_SENTINEL)
+    return prefix, suffix
+
+
+class LinkBuilder:
+    """Builds absolute links to objects by putting their pk between precompiled parts of url,
+    instead of resolving url for every object"""
+
+    def __init__(self, request):
+        self.base = request.build_absolute_uri('/')[:-1]
+        self.script_prefix = get_script_prefix()
+        self.parts = {}
+
+    def url(self, url_name, pk):
+        prefix, suffix = self.get_parts(url_name)
+        return prefix + str(pk) + suffix
+
+    def template(self, url_name, variable='id'):
+        """Returns URI template of url_name, with {variable} in place of pk"""
+
+        prefix, suffix = self.get_parts(url_name)
+        return prefix + '{' + variable + '}' + suffix
+
+    def get_parts(self, url_name):
+        if url_name not in self.parts:
+            prefix, suffix = path_parts(url_name, self.script_prefix)
+            self.parts[url_name] = (self.base + prefix, suffix)
+        return self.parts[url_name]
+
+
+def link_builder(context):
+    """Returns LinkBuilder of request in serializer context, shared by all serializers with the same context"""
+
+    if 'link_builder' not in context:
+        context['link_builder'] = LinkBuilder(context['request'])
+    return context['link_builder']
+
+
+def wants_link_templates(request):
+    return request.query_params.get(LINKS_QUERY_PARAM) == LINK_TEMPLATES
+
+
+def with_link_templates(data, link_fields, context):
+    """Returns paginated data with URI templates of link fields, given as {field: url name}, before results"""
+
+    builder = link_builder(context)
+    templates = OrderedDict((field, builder.template(url_name)) for field, url_name in link_fields.items())
+    result = OrderedDict()
+    for key, value in data.items():
+        if key == 'results':
+            result['links'] = templates
+        result[key] = value
+    return result
+
@@ -0,0 +1,70 @@
+import json
+import random
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection
+
+from ...benchmarking import ROUTES, measure_serialization, run, seed
+
+
+class Command(BaseCommand):
+    """Seeds dataset and measures throughput, latency and database queries of API routes"""
+
+    help = 'Seeds users, posts and skewed likes, and reports throughput, latency percentiles and queries per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts-per-user', type=int, default=5)
+        parser.add_argument('--likes', type=int, default=2000)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Exponent of Zipf distribution of likes and reads over posts')
+        parser.add_argument('--requests', type=int, default=200, help='Number of measured requests per route')
+        parser.add_argument('--warmup', type=int, default=10, help='Number of unmeasured requests per route')
+        parser.add_argument('--routes', nargs='+', default=list(ROUTES), choices=ROUTES)
+        parser.add_argument('--url', default=None,
+                            help='Base url of running server, for example http://localhost:8000. Dataset is seeded '
+                                 'into configured database. Without it, requests go through test client, '
+                                 'against temporary test database')
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of concurrent requests with --url')
+        parser.add_argument('--serialization-rows', type=int, default=0,
+                            help='Also report serialization time per row of page of that many posts, with links '
+                                 'resolved per row, built from precompiled urls, and replaced by URI templates')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed')
+        parser.add_argument('--output', default=None, help='File to write JSON report to, instead of stdout')
+
+    def handle(self, *args, **options):
+        """Seeds dataset, runs requests and writes JSON report"""
+
+        rng = random.Random(options['seed'])
+        if options['url']:
+            report = self.benchmark(options, rng)
+        else:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                report = self.benchmark(options, rng)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def benchmark(self, options, rng):
+        start = time.perf_counter()
+        dataset = seed(options['users'], options['posts_per_user'], options['likes'], options['skew'], rng)
+        seeded = time.perf_counter()
+        routes = run(options['routes'], dataset, options['requests'], rng, base_url=options['url'],
+                     concurrency=options['concurrency'], warmup=options['warmup'])
+
+        config = {key: options[key] for key in ('users', 'posts_per_user', 'likes', 'skew', 'requests', 'url',
+                                                'concurrency', 'seed')}
+        config['seed_seconds'] = round(seeded - start, 2)
+        report = {'config': config, 'routes': routes}
+        if options['serialization_rows']:
+            report['serialization'] = measure_serialization(options['serialization_rows'])
+        return report
@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from ...models import LikeCounter
+
+
+class Command(BaseCommand):
+    """Folds like counter shards, so reading number of likes sums fewer rows"""
+
+    help = 'Folds shards of like counters into one row per post and account'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recount all counters from likes, e.g. after likes were inserted with bulk_create')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            LikeCounter.objects.rebuild()
+            self.stdout.write('rebuilt {} counters'.format(LikeCounter.objects.count()))
+        else:
+            self.stdout.write('folded {} shards'.format(LikeCounter.objects.compact()))
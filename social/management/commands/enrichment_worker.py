@@ -0,0 +1,33 @@
+import time
+
+from django.core.management import BaseCommand
+
+from ...enrichment import cache_stats, claim_jobs, get_enricher, get_verifier, run_jobs
+
+
+class Command(BaseCommand):
+    """Runs email verification and data enrichment of signed up accounts"""
+
+    help = 'Runs queued email verification and enrichment jobs of signed up accounts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Number of jobs claimed at once')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent provider requests')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when there are no jobs')
+        parser.add_argument('--once', action='store_true', help='Stop when there are no more queued jobs')
+
+    def handle(self, *args, **options):
+        """Claims and runs batches of jobs, until stopped, or until queue is empty if --once is given"""
+
+        verifier = get_verifier()
+        enricher = get_enricher()
+
+        while True:
+            jobs = claim_jobs(options['batch_size'])
+            if jobs:
+                run_jobs(jobs, verifier, enricher, options['concurrency'])
+                self.stdout.write('processed {} jobs, cache {}'.format(len(jobs), cache_stats.as_dict()))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['sleep'])
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from ...export import EXPORTS, export, parse_since
+
+
+class Command(BaseCommand):
+    """Streams posts, likes or accounts as NDJSON to file or stdout, with constant memory"""
+
+    help = 'Exports posts, likes or accounts as NDJSON, one object per line'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--since-pk', type=int, default=None, help='Export only rows with greater pk')
+        parser.add_argument('--since', default=None,
+                            help='Export only rows created after this ISO 8601 date and time')
+        parser.add_argument('--gzip', action='store_true', help='Compress output with gzip')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Number of rows fetched at once')
+        parser.add_argument('--output', default=None, help='File to write export to, instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options['since']) if options['since'] else None
+            chunks = export(options['kind'], options['since_pk'], since, options['gzip'], options['chunk_size'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                self.write(chunks, file)
+        else:
+            self.write(chunks, sys.stdout.buffer)
+
+    def write(self, chunks, file):
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
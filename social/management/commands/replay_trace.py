@@ -0,0 +1,78 @@
+import json
+
+import requests
+from django.core.management import BaseCommand, CommandError
+from requests.adapters import HTTPAdapter
+
+from ...bot.records import User
+from ...bot.tokens import TokenManager
+from ...bot.trace import credentials, read_trace, rebase, replay, schedule
+
+
+class Command(BaseCommand):
+    """Replays requests recorded by social_bot --record open-loop, at recorded times or at fixed rate,
+    and reports latency percentiles, error rates and response time histograms per endpoint"""
+
+    help = 'Replays JSONL trace recorded by social_bot --record, without waiting for responses'
+
+    log_in_url = 'http://localhost:8000/api/token'
+    refresh_url = 'http://localhost:8000/api/token/refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', help='JSONL file written by social_bot --record')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Requests per second. Without it, requests are sent at recorded times')
+        parser.add_argument('--speed', type=float, default=1.0, help='Multiplier of recorded request rate')
+        parser.add_argument('--url', default=None,
+                            help='Base url of server to replay against, instead of recorded one')
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='Maximum number of requests in flight. Requests over it wait, and their waiting '
+                                 'time is included in response time')
+        parser.add_argument('--output', default=None, help='File to write JSON report to, instead of stdout')
+
+    def handle(self, *args, **options):
+        """Logs in recorded users, replays requests and writes JSON report.
+        Requests which are not idempotent, like sign ups and likes, reproduce recorded responses only if server's
+        database is restored to its state before recording"""
+
+        if options['speed'] <= 0 or (options['rate'] is not None and options['rate'] <= 0):
+            raise CommandError('--rate and --speed must be positive')
+
+        with open(options['trace']) as file:
+            records = read_trace(file)
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=options['concurrency'])
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        tokens = TokenManager(rebase(self.log_in_url, options['url']), rebase(self.refresh_url, options['url']))
+        users = {username: User(username, password) for username, password in credentials(records).items()}
+
+        def send(record):
+            headers = tokens.headers(users[record['user']], session) if record['user'] else {}
+            # JSON arrays are bodies of bulk requests
+            body = {'json': record['data']} if isinstance(record['data'], list) else {'data': record['data']}
+            return session.request(record['method'], rebase(record['url'], options['url']), headers=headers,
+                                   **body).status_code
+
+        # users of authenticated requests log in before replay, so it is not slowed down by password hashing
+        for username in {record['user'] for record in records if record['user']}:
+            if username not in users:
+                raise CommandError('Trace has no credentials of user ' + username)
+            tokens.headers(users[username], session)
+
+        results, elapsed = replay(records, schedule(records, options['rate'], options['speed']), send,
+                                  options['concurrency'])
+        session.close()
+
+        report = {
+            'config': {key: options[key] for key in ('trace', 'rate', 'speed', 'url', 'concurrency')},
+            'elapsed_seconds': round(elapsed, 3),
+            'endpoints': {endpoint: result.as_dict(elapsed) for endpoint, result in sorted(results.items())},
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
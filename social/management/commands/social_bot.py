@@ -1,31 +1,58 @@
 import json
 import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from django.core.management import BaseCommand
 from faker import Factory
-
-
-class User:
-    def __init__(self, username, password):
-        self.username = username
-        self.password = password
-        self.posts = []
-        self.likes = 0
-        self.token = ''
-
-
-class Post:
-    def __init__(self, title, content, user, link):
-        self.user = user
-        self.title = title
-        self.content = content
-        self.likes_number = 0
-        self.like_link = link
+from requests.adapters import HTTPAdapter
+
+from ...bot.direct import DirectLoader
+from ...bot.records import Post, User
+from ...bot.scheduler import LikeScheduler
+from ...bot.tokens import TokenError, TokenManager
+from ...bot.trace import TraceRecorder
+
+
+class CountingSession(requests.Session):
+    """requests.Session, shared between worker threads, which counts sent requests,
+    and records them with TraceRecorder, if it is given"""
+
+    def __init__(self, pool_size, recorder=None):
+        super(CountingSession, self).__init__()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        self.requests_sent = 0
+        self.lock = threading.Lock()
+        self.recorder = recorder
+
+    def request(self, method, url, user=None, **kwargs):
+        with self.lock:
+            self.requests_sent += 1
+        if self.recorder is None:
+            return super(CountingSession, self).request(method, url, **kwargs)
+
+        start = time.perf_counter()
+        response = super(CountingSession, self).request(method, url, **kwargs)
+        self.recorder.record(method, url, kwargs.get('json') or kwargs.get('data'), user, start, response.status_code,
+                             time.perf_counter() - start)
+        return response
+
+
+class PhaseStats:
+    def __init__(self, name, requests_sent, seconds):
+        self.name = name
+        self.requests_sent = requests_sent
+        self.seconds = seconds
 
     def __str__(self):
-        return self.title
+        rate = self.requests_sent / self.seconds if self.seconds else 0
+        return '{}: {} requests in {:.2f}s ({:.1f} requests/sec)'.format(self.name, self.requests_sent, self.seconds,
+                                                                          rate)
 
 
 class Command(BaseCommand):
@@ -33,19 +60,29 @@ class Command(BaseCommand):
 
     sign_up_url = 'http://localhost:8000/api/accounts/?bot=True'
     log_in_url = 'http://localhost:8000/api/token'
+    refresh_url = 'http://localhost:8000/api/token/refresh'
+    bulk_posts_url = 'http://localhost:8000/api/posts/bulk/'
+    # at most BULK_MAX_ITEMS of server
+    bulk_size = 100
     faker = Factory.create()
     created_users = []
 
+    def run_phase(self, name, function, items):
+        """Calls function for every item with pool of concurrency workers, sharing one connection pool,
+        and records number of requests per second for the phase"""
+
+        session = CountingSession(self.concurrency, self.recorder)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # list() re-raises exceptions from workers
+            list(executor.map(lambda item: function(item, session), items))
+        self.phase_stats.append(PhaseStats(name, session.requests_sent, time.perf_counter() - start))
+        session.close()
+
     def sign_up_all(self):
         """Sign up number of users, given in bot_config.json file"""
 
-        i = 0
-        session = requests.Session()
-
-        while i < self.number_of_users:
-            self.sign_up(session)
-            i += 1
-        session.close()
+        self.run_phase('sign up', lambda i, session: self.sign_up(session), range(self.number_of_users))
 
     def sign_up(self, session):
         """Sign up individual users"""
@@ -61,53 +98,42 @@ class Command(BaseCommand):
     def log_in(self):
         """Log in all users, using users from sign_up_all method"""
 
-        session = requests.Session()
-        for user in self.created_users:
-            self.get_new_token(user, session)
-        session.close()
+        self.run_phase('log in', self.tokens.log_in, list(self.created_users))
 
-    def get_new_token(self, user, session):
-        """For given user, generates JSON Web Token (JWT), and assigns it to user.token"""
+    def post_as(self, session, user, url, data=None, json=None):
+        """Posts data, or json, with user's access token, which is renewed before it expires.
+        If server still rejects the token, it is renewed and request is sent once more"""
 
-        while True:
-            response = session.post('http://localhost:8000/api/token',
-                                    data={'username': user.username, 'password': user.password})
-            if response.status_code == 200:
-                user.token = json.loads(response.content)['access']
-                break
+        for attempt in range(2):
+            headers = self.tokens.headers(user, session)
+            response = session.post(url, data=data, json=json, headers=headers, user=user)
+            if response.status_code != 401:
+                return response
+            self.tokens.expire(user, headers['Authorization'].split()[1])
+        raise TokenError('Server rejected renewed token of {}'.format(user))
 
     def create_all_posts(self):
         """For all created users, creates random number of posts, in range from 1 to  max_posts_per_user,
          given in bot_config.json file """
 
-        session = requests.Session()
-        for user in self.created_users:
-            self.create_post(user, session)
-        session.close()
+        self.run_phase('create posts', self.create_post, list(self.created_users))
 
     def create_post(self, user, session):
         """Creates random number od posts for given user, ranging from 1 to max_posts_per_user,
-         given in bot_config.json file"""
+         given in bot_config.json file. Posts are sent in bulk requests of up to bulk_size posts, and those which
+         were not created, because their titles were taken, are sent again with new titles"""
 
         number_of_post_per_user = random.randrange(1, self.max_posts_per_user)
-        i = 0
-        while (i < number_of_post_per_user):
-            while True:
-                title = self.faker.sentence()
-                content = self.faker.text()
-                response = session.post(url='http://localhost:8000/api/posts/',
-                                        data={'post_title': title, 'post_content': content},
-                                        headers={'Authorization': 'Bearer ' + user.token})
-
-                # check if token is expired, and get new one if it is
-                if response.status_code == 401:
-                    self.get_new_token(user, session)
-
-                if response.status_code == 201:
-                    user.posts.append(Post(title, content, user, json.loads(response.content)['like_post']))
-
-                    i += 1
-                    break
+        while len(user.posts) < number_of_post_per_user:
+            data = [{'post_title': self.faker.sentence(), 'post_content': self.faker.text()}
+                    for _ in range(min(number_of_post_per_user - len(user.posts), self.bulk_size))]
+            response = self.post_as(session, user, self.bulk_posts_url, json=data)
+            if response.status_code not in (201, 207):
+                continue
+            for item, result in zip(data, response.json()['results']):
+                if result['status'] == 201:
+                    user.posts.append(Post(item['post_title'], item['post_content'], user,
+                                           result['data']['like_post']))
 
     def like(self):
         """Function that generates likes, following this criteria:
@@ -118,81 +144,31 @@ class Command(BaseCommand):
         Users cannot like their own posts.
         Posts can be liked multiple times, but one user can like a certain post only once."""
 
-        session = requests.Session()
-        while True:
-            current_user = self.get_user_with_max_posts()
-            posts_that_can_be_liked = self.get_available_posts(current_user)
-
-            # all users have reached max likes limit, or there are no posts with 0 likes
-            if current_user is None or len(posts_that_can_be_liked) == 0:
-                break
-            self.start_to_like(session, current_user, posts_that_can_be_liked)
-
-    def start_to_like(self, session, user, posts):
-        """For given user, start liking until number of user likes has reached max_likes_per_user,
-         given in bot_config.json, or there are no available posts to like"""
-
-        posts_copy = posts.copy()
-
-        while user.likes < self.max_likes_per_user:
+        session = CountingSession(self.concurrency, self.recorder)
+        start = time.perf_counter()
+        scheduler = LikeScheduler(self.created_users, self.max_likes_per_user)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
             while True:
+                turn = scheduler.next_turn()
 
-                if len(posts_copy) <= 0:
-                    return
-                post = random.choice(posts_copy)
-
-                response = session.get(post.like_link, headers={'Authorization': 'Bearer ' + user.token})
-
-                # check if token is expired, and get new one if it is
-                if response.status_code == 401:
-                    self.get_new_token(user, session)
-
-                if response.status_code == 201:
-                    posts_copy.remove(post)
-                    posts[posts.index(post)].likes_number += 1
-                    user.likes += 1
+                # all users have reached max likes limit, or there are no posts with 0 likes
+                if turn is None:
                     break
+                self.start_to_like(session, executor, scheduler, *turn)
+        self.phase_stats.append(PhaseStats('like', session.requests_sent, time.perf_counter() - start))
+        session.close()
 
-    def get_user_with_max_posts(self):
-        """Returns user who is next to perform like. It looks for the user with max number of posts,
-         but who is not reached max number of likes, given in bot_config.json.
-         If all users are reached max number of likes, function returns None"""
-
-        max_posts = -1
-        condition = False
-        location = -1
-
-        for user in self.created_users:
-
-            if user.likes >= self.max_likes_per_user:
-                continue
-
-            if len(user.posts) > max_posts:
-                condition = True
-                max_posts = len(user.posts)
-                location = self.created_users.index(user)
-
-        if condition:
-            return self.created_users[location]
-        else:
-            return None
+    def start_to_like(self, session, executor, scheduler, user, posts):
+        """Sends likes of one user's turn concurrently, and reports liked and failed posts to scheduler"""
 
-    def get_available_posts(self, current_user):
-        """Creates list of all possible posts, for current_user to perform like
-        Check all users if they have at least one post with zero likes, and if there is,
-        extends posts list with all user's posts
-        """
+        results = list(executor.map(lambda post: self.send_like(session, user, post), posts))
+        scheduler.complete_turn(user, [post for post, liked in zip(posts, results) if liked],
+                                [post for post, liked in zip(posts, results) if not liked])
 
-        posts = []
-        for user in self.created_users:
-            if user == current_user:
-                continue
-            for post in user.posts:
-                if post.likes_number == 0:
-                    posts.extend(user.posts)
-                    break
+    def send_like(self, session, user, post):
+        """Sends like for given post, as given user. Returns True if post is liked"""
 
-        return posts
+        return self.post_as(session, user, post.like_link).status_code == 201
 
     def get_credentials(self):
         """Returns random username, password and email, generated by faker module"""
@@ -208,15 +184,58 @@ class Command(BaseCommand):
             self.number_of_users = data['number_of_users']
             self.max_posts_per_user = data['max_posts_per_user']
             self.max_likes_per_user = data['max_likes_per_user']
+            self.concurrency = max(data.get('concurrency', 1), 1)
+
+    def load_directly(self, batch_size, processes):
+        """Plans users, posts and likes in memory, and inserts them through ORM instead of API"""
+
+        start = time.perf_counter()
+        loader = DirectLoader(self.faker, random.Random(), batch_size=batch_size, processes=processes)
+        users, likes = loader.plan(self.number_of_users, self.max_posts_per_user, self.max_likes_per_user)
+        planned = time.perf_counter()
+        accounts, posts, likes = loader.load(users, likes)
+
+        self.stdout.write('planned in {:.2f}s, loaded {} accounts, {} posts and {} likes in {:.2f}s'.format(
+            planned - start, accounts, posts, likes, time.perf_counter() - planned))
+
+    def add_arguments(self, parser):
+        parser.add_argument('--direct', action='store_true',
+                            help='Plan the workload in memory and insert it through ORM, without running server')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows per bulk insert and transaction in direct mode')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Number of processes for password hashing in direct mode')
+        parser.add_argument('--record', default=None,
+                            help='JSONL file to record sent requests to, for replay_trace command')
 
     def handle(self, *args, **options):
         """Runs all bot's functions"""
 
         self.read_config_file()
+        self.phase_stats = []
+        self.tokens = TokenManager(self.log_in_url, self.refresh_url)
 
         if self.number_of_users == 0:
             return
 
+        if options['direct']:
+            self.load_directly(options['batch_size'], options['processes'])
+            return
+
+        if options['record']:
+            with open(options['record'], 'w') as file:
+                self.recorder = TraceRecorder(file)
+                self.run_bot()
+        else:
+            self.recorder = None
+            self.run_bot()
+
+        for stats in self.phase_stats:
+            self.stdout.write(str(stats))
+
+    def run_bot(self):
+        """Signs up users, logs them in, creates posts and likes through API"""
+
         self.sign_up_all()
 
         self.log_in()
@@ -0,0 +1,139 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# upper bounds of histogram buckets, in seconds for timings
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+current = threading.local()
+
+
+def format_labels(labels):
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, in Prometheus format"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_prometheus(self, name, labels):
+        """Returns bucket, sum and count lines, with labels given as list of 'name="value"' strings"""
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append('{}_bucket{} {}'.format(name, format_labels(labels + ['le="{}"'.format(bound)]), cumulative))
+        lines.append('{}_sum{} {}'.format(name, format_labels(labels), self.sum))
+        lines.append('{}_count{} {}'.format(name, format_labels(labels), self.count))
+        return lines
+
+
+class RequestMetrics:
+    """Database queries and timings of one request"""
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0
+        self.serializer_time = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper, which records query and its duration"""
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+
+class Registry:
+    """Histograms of wall, database and serializer time, and of number of queries, per route"""
+
+    histograms = (
+        ('social_request_duration_seconds', 'Wall time of requests', DURATION_BUCKETS),
+        ('social_request_db_duration_seconds', 'Time spent in database queries', DURATION_BUCKETS),
+        ('social_request_serializer_duration_seconds', 'Time spent in serializers', DURATION_BUCKETS),
+        ('social_request_db_queries', 'Number of database queries', QUERY_BUCKETS),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.requests = Counter()
+        self.overhead = Histogram(DURATION_BUCKETS)
+
+    def observe(self, route, status_code, wall_time, request_metrics):
+        values = (wall_time, request_metrics.db_time, request_metrics.serializer_time, len(request_metrics.queries))
+        with self.lock:
+            if route not in self.routes:
+                self.routes[route] = [Histogram(buckets) for _, _, buckets in self.histograms]
+            for histogram, value in zip(self.routes[route], values):
+                histogram.observe(value)
+            self.requests[route, status_code] += 1
+
+    def observe_overhead(self, seconds):
+        with self.lock:
+            self.overhead.observe(seconds)
+
+    def to_prometheus(self):
+        """Returns all metrics in Prometheus text exposition format"""
+
+        with self.lock:
+            lines = ['# HELP social_requests_total Number of requests', '# TYPE social_requests_total counter']
+            for (route, status_code), count in sorted(self.requests.items()):
+                lines.append('social_requests_total{{route="{}",status="{}"}} {}'.format(route, status_code, count))
+
+            for index, (name, description, _) in enumerate(self.histograms):
+                lines.extend(['# HELP {} {}'.format(name, description), '# TYPE {} histogram'.format(name)])
+                for route, histograms in sorted(self.routes.items()):
+                    lines.extend(histograms[index].to_prometheus(name, ['route="{}"'.format(route)]))
+
+            name = 'social_metrics_overhead_seconds'
+            lines.extend(['# HELP {} Time spent recording metrics'.format(name), '# TYPE {} histogram'.format(name)])
+            lines.extend(self.overhead.to_prometheus(name, []))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+            self.requests.clear()
+            self.overhead = Histogram(DURATION_BUCKETS)
+
+
+registry = Registry()
+
+
+def record_serializer_time(seconds):
+    """Adds serializer time to current request, if metrics middleware is recording it"""
+
+    request_metrics = getattr(current, 'request_metrics', None)
+    if request_metrics is not None:
+        request_metrics.serializer_time += seconds
+
+
+def cache_stats_to_prometheus(name, stats):
+    """Returns hits and misses counters of CacheStats, per kind, in Prometheus text format"""
+
+    lines = []
+    kinds = sorted(stats.as_dict().items())
+    for counter in ('hits', 'misses'):
+        metric = '{}_{}_total'.format(name, counter)
+        lines.extend(['# HELP {} Number of cache {}'.format(metric, counter), '# TYPE {} counter'.format(metric)])
+        for kind, values in kinds:
+            lines.append('{}{{kind="{}"}} {}'.format(metric, kind, values[counter]))
+    return '\n'.join(lines) + '\n'
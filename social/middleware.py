@@ -0,0 +1,100 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import metrics, routers
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Records database queries, database time, serializer time and wall time of every request, per resolved route.
+    Adds them to response headers, keeps histograms for /api/metrics, and logs slow requests with their SQL"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        request_metrics = metrics.RequestMetrics()
+        metrics.current.request_metrics = request_metrics
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics.execute_wrapper))
+                setup_time = time.perf_counter() - start
+                response = self.get_response(request)
+        finally:
+            metrics.current.request_metrics = None
+        end = time.perf_counter()
+        wall_time = end - start
+
+        route = request.resolver_match.url_name if request.resolver_match else 'unresolved'
+        metrics.registry.observe(route, response.status_code, wall_time, request_metrics)
+
+        response['X-DB-Queries'] = str(len(request_metrics.queries))
+        response['Server-Timing'] = 'db;dur={:.2f}, serializer;dur={:.2f}, total;dur={:.2f}'.format(
+            request_metrics.db_time * 1000, request_metrics.serializer_time * 1000, wall_time * 1000)
+
+        if wall_time >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            logger.warning('Slow request %s %s (%s) took %.3fs, %d queries in %.3fs:\n%s', request.method,
+                           request.get_full_path(), route, wall_time, len(request_metrics.queries),
+                           request_metrics.db_time,
+                           '\n'.join('{:.3f}s {}'.format(duration, sql) for sql, duration in request_metrics.queries))
+
+        metrics.registry.observe_overhead(setup_time + time.perf_counter() - end)
+        return response
+
+
+def request_user_id(request):
+    """Returns id of user of request's JWT, or of its session, without loading user, or None if it has neither"""
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is not None:
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+        try:
+            return str(authentication.get_validated_token(raw_token)[api_settings.USER_ID_CLAIM])
+        except (InvalidToken, KeyError):
+            return None
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+class ReplicaMiddleware:
+    """Lets ReplicaRouter send reads of safe requests to replicas, and pins user to primary for REPLICA_PIN_SECONDS
+    after every request which is not safe, or which wrote to database, so user reads own posts and likes even if
+    replicas lag. Does nothing without DATABASE_REPLICAS. Goes after SessionMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        user_id = request_user_id(request)
+        safe = request.method in SAFE_METHODS
+        routers.start_routing(safe and (user_id is None or not routers.is_pinned_to_primary(user_id)))
+        try:
+            response = self.get_response(request)
+            wrote = routers.wrote()
+        finally:
+            routers.stop_routing()
+
+        if not safe or wrote:
+            # session login sets user id only while request is processed
+            user_id = user_id or request_user_id(request)
+            if user_id is not None:
+                routers.pin_to_primary(user_id)
+        return response
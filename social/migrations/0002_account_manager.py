@@ -0,0 +1,20 @@
+# Generated by Django 2.1.7 on 2026-10-18 19:50
+
+from django.db import migrations
+import social.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='account',
+            managers=[
+                ('objects', social.models.AccountManager()),
+            ],
+        ),
+    ]
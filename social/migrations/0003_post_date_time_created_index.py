@@ -0,0 +1,18 @@
+# Generated by Django 2.1.7 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_account_manager'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='date_time_created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
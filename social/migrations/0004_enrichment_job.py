@@ -0,0 +1,41 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0003_post_date_time_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrichmentJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('date_time_updated', models.DateTimeField(auto_now=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='enrichment_status',
+            field=models.CharField(choices=[('skipped', 'Skipped'), ('pending', 'Pending'), ('done', 'Done'), ('rejected', 'Rejected'), ('failed', 'Failed')], default='skipped', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='enrichmentjob',
+            name='account',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='enrichment_job', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='enrichmentjob',
+            index=models.Index(fields=['status', 'run_after'], name='social_enri_status_1e10c6_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+# counts likes which exist before migration, in shard 0 of every counter
+COUNT_LIKES = """
+INSERT INTO social_likecounter (kind, object_id, shard, value)
+SELECT 'post', related_post_id, 0, COUNT(*) FROM social_like GROUP BY related_post_id;
+
+INSERT INTO social_likecounter (kind, object_id, shard, value)
+SELECT 'account', related_user_id, 0, COUNT(*) FROM social_like GROUP BY related_user_id;
+"""
+
+DELETE_COUNTS = """
+DELETE FROM social_likecounter;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_enrichment_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LikeCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('account', 'Account')], max_length=7)),
+                ('object_id', models.IntegerField()),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='likecounter',
+            unique_together={('kind', 'object_id', 'shard')},
+        ),
+        migrations.RunSQL(COUNT_LIKES, DELETE_COUNTS),
+    ]
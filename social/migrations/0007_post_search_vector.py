@@ -0,0 +1,49 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# keeps search vector of every inserted or updated post up to date, with title weighted above content
+CREATE_TRIGGER = """
+CREATE FUNCTION social_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.post_title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.post_content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_post_search_vector_update BEFORE INSERT OR UPDATE ON social_post
+FOR EACH ROW EXECUTE PROCEDURE social_post_search_vector_update();
+
+UPDATE social_post SET search_vector =
+    setweight(to_tsvector('pg_catalog.english', coalesce(post_title, '')), 'A') ||
+    setweight(to_tsvector('pg_catalog.english', coalesce(post_content, '')), 'B');
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER social_post_search_vector_update ON social_post;
+DROP FUNCTION social_post_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0006_version_stamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='social_post_search__ad87e9_gin'),
+        ),
+    ]
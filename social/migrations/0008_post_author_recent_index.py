@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0007_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-date_time_created'], name='social_post_author__f46848_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0008_post_author_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['related_user', 'related_post'], name='social_like_related_71b28c_idx'),
+        ),
+    ]
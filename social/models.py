@@ -1,28 +1,451 @@
-from django.contrib.auth.models import AbstractUser
-from django.contrib.postgres.fields import JSONField
-from django.db import models
+import random
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections, models, router, transaction
+from django.db.models import F, FloatField, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.utils import timezone
+
+
+# text search configuration of posts' search vector and search queries
+SEARCH_CONFIG = 'english'
+
+
+def only_fields(queryset, fields):
+    """Returns queryset which loads only pk, and those of given fields which are columns of its model,
+    or columns of related models, given as relation__column"""
+
+    columns = {field.name for field in queryset.model._meta.concrete_fields}
+    return queryset.only('pk', *sorted(field for field in fields if field in columns or '__' in field))
+
+
+def likes_number_subquery(kind):
+    """Returns correlated subquery that sums like counter shards of given kind for outer row's pk.
+    Unlike join with GROUP BY, it lets ordered and limited pages use index on outer table"""
+
+    shards = LikeCounter.objects.filter(kind=kind, object_id=OuterRef('pk')).order_by().values('object_id')
+    return Coalesce(Subquery(shards.annotate(total=Sum('value')).values('total'), output_field=IntegerField()), 0)
+
+
+class ArraySubquery(Subquery):
+    """Subquery which returns its rows as array of a single column"""
+
+    template = 'ARRAY(%(subquery)s)'
+
+
+class AccountQuerySet(models.QuerySet):
+    def with_details(self, include_user_details=False, fields=None):
+        """Annotates accounts with number of likes, and titles of ACCOUNT_RECENT_POSTS most recent posts,
+        in the same query. User details, which can be large, are deferred unless include_user_details is True.
+        If fields are given, only those fields are loaded, and only likes_number and posts among them are annotated"""
+
+        queryset = self
+        if fields is None or 'likes_number' in fields:
+            queryset = queryset.annotate(likes_number=likes_number_subquery(LikeCounter.ACCOUNT))
+        if fields is None or 'posts' in fields:
+            recent_posts = Post.objects.filter(author=OuterRef('pk')).order_by('-date_time_created', '-pk')
+            queryset = queryset.annotate(recent_post_titles=ArraySubquery(
+                recent_posts.values('post_title')[:settings.ACCOUNT_RECENT_POSTS],
+                output_field=ArrayField(models.CharField(max_length=255))))
+
+        if fields is not None:
+            return only_fields(queryset, set(fields) - ({'user_details'} if not include_user_details else set()))
+        if not include_user_details:
+            queryset = queryset.defer('user_details')
+        return queryset
+
+
+class AccountManager(UserManager.from_queryset(AccountQuerySet)):
+    pass
 
 
 class Account(AbstractUser, models.Model):
+    ENRICHMENT_SKIPPED = 'skipped'
+    ENRICHMENT_PENDING = 'pending'
+    ENRICHMENT_DONE = 'done'
+    ENRICHMENT_REJECTED = 'rejected'
+    ENRICHMENT_FAILED = 'failed'
+    ENRICHMENT_STATUSES = (
+        (ENRICHMENT_SKIPPED, 'Skipped'),
+        (ENRICHMENT_PENDING, 'Pending'),
+        (ENRICHMENT_DONE, 'Done'),
+        (ENRICHMENT_REJECTED, 'Rejected'),
+        (ENRICHMENT_FAILED, 'Failed'),
+    )
+
     user_details = JSONField(null=True)
+    enrichment_status = models.CharField(max_length=10, choices=ENRICHMENT_STATUSES, default=ENRICHMENT_SKIPPED)
+
+    objects = AccountManager()
 
     def __str__(self):
         return self.username
 
 
+class PostQuerySet(models.QuerySet):
+    def with_likes_number(self):
+        """Annotates posts with number of likes, and joins post author. Search vector, which is not shown, is deferred"""
+
+        return self.select_related('author').defer('search_vector').count_likes()
+
+    def count_likes(self):
+        return self.annotate(likes_number=likes_number_subquery(LikeCounter.POST))
+
+    def with_fields(self, fields):
+        """Loads only given fields of posts, where author joins author's username, and likes_number counts likes.
+        Loads all fields, except search vector, if fields are None"""
+
+        if fields is None:
+            return self.with_likes_number()
+
+        queryset = self
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+            fields = set(fields) | {'author__username'}
+        if 'likes_number' in fields:
+            queryset = queryset.count_likes()
+        # creation time is kept for cursors of keyset pagination
+        return only_fields(queryset, set(fields) | {'date_time_created'})
+
+    def search(self, text):
+        """Filters posts whose title or content match text, using GIN index of search vector,
+        and annotates them with rank, where title matches count more than content matches"""
+
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        # rank is cast from real to double precision, so its value survives round trip through keyset cursor
+        return self.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+
+
 class Post(models.Model):
     author = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='posts')
-    date_time_created = models.DateTimeField(auto_now_add=True)
+    date_time_created = models.DateTimeField(auto_now_add=True, db_index=True)
     post_title = models.CharField(max_length=255, default='', unique=True)
     post_content = models.TextField(default='')
+    # maintained by database trigger from post_title and post_content, see migration 0007_post_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            # recent posts of account
+            models.Index(fields=['author', '-date_time_created']),
+        ]
 
     def __str__(self):
         return self.post_title
 
 
+def execute_returning_id(model, sql, params):
+    """Runs single write statement on database for writing model, and returns id from its RETURNING clause"""
+
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute(sql.format(like=Like._meta.db_table, post=Post._meta.db_table,
+                                  counter=LikeCounter._meta.db_table, stamp=VersionStamp._meta.db_table), params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class LikeManager(models.Manager):
+    # adds delta to random shards of liked post's and liking account's counters, if statement in changed CTE
+    # returned the like. Rows are locked in the same order as LikeCounterManager.add and VersionStampManager.bump
+    # lock them, sorted by bytes of keys, so concurrent likes and bulk likes do not deadlock
+    count_changed_like = (
+        'counted AS ('
+        'INSERT INTO {counter} (kind, object_id, shard, value) '
+        'SELECT counters.kind, counters.object_id, counters.shard, %s '
+        'FROM changed, (VALUES (%s, %s, %s), (%s, %s, %s)) AS counters (kind, object_id, shard) '
+        'ORDER BY counters.kind COLLATE "C", counters.object_id, counters.shard '
+        'ON CONFLICT (kind, object_id, shard) DO UPDATE SET value = {counter}.value + EXCLUDED.value), '
+        'stamped AS ('
+        'INSERT INTO {stamp} (key, shard, version, modified) '
+        'SELECT stamps.key, %s, 1, clock_timestamp() FROM changed, (VALUES (%s), (%s), (%s)) AS stamps (key) '
+        'ORDER BY stamps.key COLLATE "C" '
+        'ON CONFLICT (key, shard) DO UPDATE SET version = {stamp}.version + 1, modified = EXCLUDED.modified) '
+        'SELECT id FROM changed')
+
+    def counter_params(self, delta, post_pk, user):
+        return [delta, LikeCounter.POST, post_pk, LikeCounter.objects.random_shard(),
+                LikeCounter.ACCOUNT, user.pk, LikeCounter.objects.random_shard(),
+                VersionStamp.objects.random_shard()] + VersionStamp.like_keys(post_pk, user.pk)
+
+    def like(self, post_pk, user):
+        """Creates like with single INSERT, if post exists, user is not its author, and user did not like it already.
+        Like counters and version stamps are updated in the same statement.
+        Returns created like, or None if it is not created"""
+
+        like_pk = execute_returning_id(
+            self.model,
+            'WITH changed AS ('
+            'INSERT INTO {like} (related_post_id, related_user_id) '
+            'SELECT id, %s FROM {post} WHERE id = %s AND author_id <> %s '
+            'ON CONFLICT (related_post_id, related_user_id) DO NOTHING RETURNING id), ' + self.count_changed_like,
+            [user.pk, post_pk, user.pk] + self.counter_params(1, post_pk, user))
+        if like_pk is None:
+            return None
+        return self.model(pk=like_pk, related_post_id=post_pk, related_user=user)
+
+    def like_many(self, post_pks, user):
+        """Creates likes of many posts with single INSERT, skipping posts which do not exist, are user's own,
+        or are already liked by user, and updates like counters and version stamps of created likes.
+        Returns {post pk: created like}"""
+
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO {like} (related_post_id, related_user_id) '
+                    'SELECT id, %s FROM {post} WHERE id = ANY(%s) AND author_id <> %s ORDER BY id '
+                    'ON CONFLICT (related_post_id, related_user_id) DO NOTHING '
+                    'RETURNING id, related_post_id'.format(like=Like._meta.db_table, post=Post._meta.db_table),
+                    [user.pk, list(post_pks), user.pk])
+                liked = {post_pk: like_pk for like_pk, post_pk in cursor.fetchall()}
+
+            changes = [(LikeCounter.ACCOUNT, user.pk, len(liked))] if liked else []
+            keys = []
+            for post_pk in liked:
+                changes.append((LikeCounter.POST, post_pk, 1))
+                keys.extend(VersionStamp.like_keys(post_pk, user.pk))
+            LikeCounter.objects.add(changes)
+            VersionStamp.objects.bump(keys)
+        return {post_pk: self.model(pk=like_pk, related_post_id=post_pk, related_user=user)
+                for post_pk, like_pk in liked.items()}
+
+    def unlike(self, post_pk, user):
+        """Deletes like with single DELETE, which also updates like counters and version stamps.
+        Returns deleted like, or None if user did not like the post"""
+
+        like_pk = execute_returning_id(
+            self.model,
+            'WITH changed AS ('
+            'DELETE FROM {like} WHERE related_post_id = %s AND related_user_id = %s RETURNING id), ' +
+            self.count_changed_like,
+            [post_pk, user.pk] + self.counter_params(-1, post_pk, user))
+        if like_pk is None:
+            return None
+        return self.model(pk=like_pk, related_post_id=post_pk, related_user=user)
+
+
 class Like(models.Model):
     related_post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='likes')
     related_user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='likes')
 
+    objects = LikeManager()
+
     class Meta:
+        # unique index (related_post, related_user) covers likers of post, and this one posts liked by user
         unique_together = (('related_post', 'related_user'),)
+        indexes = [models.Index(fields=['related_user', 'related_post'])]
+
+
+class LikeCounterManager(models.Manager):
+    def random_shard(self):
+        return random.randrange(settings.LIKE_COUNTER_SHARDS)
+
+    def add(self, changes):
+        """Adds deltas to random shards of counters, given as list of (kind, object_id, delta), with single upsert.
+        Counters are upserted in sorted order, so concurrent upserts lock them in the same order"""
+
+        values = {}
+        for kind, object_id, delta in changes:
+            key = (kind, object_id, self.random_shard())
+            values[key] = values.get(key, 0) + delta
+        if not values:
+            return
+        values = sorted(values.items())
+
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {counter} (kind, object_id, shard, value) VALUES {values} '
+                'ON CONFLICT (kind, object_id, shard) DO UPDATE SET value = {counter}.value + EXCLUDED.value'.format(
+                    counter=self.model._meta.db_table, values=', '.join(['(%s, %s, %s, %s)'] * len(values))),
+                [param for key, value in values for param in key + (value,)])
+
+    def count_likes(self, likes, batch_size=1000):
+        """Adds likes inserted with bulk_create to counters, with one upsert per batch_size likes"""
+
+        for start in range(0, len(likes), batch_size):
+            changes = []
+            for like in likes[start:start + batch_size]:
+                changes.append((LikeCounter.POST, like.related_post_id, 1))
+                changes.append((LikeCounter.ACCOUNT, like.related_user_id, 1))
+            with transaction.atomic(using=router.db_for_write(self.model)):
+                self.add(changes)
+
+    def compact(self):
+        """Folds all shards of every counter into shard 0, and removes counters which are 0.
+        Every counter is folded by single statement, in its own transaction, so concurrent likes are not lost,
+        and compaction never holds rows of two counters, which likes lock in sorted order, so they do not deadlock.
+        Returns number of folded shards"""
+
+        folded = 0
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute('SELECT DISTINCT kind COLLATE "C", object_id FROM {counter} WHERE shard <> 0 '
+                           'ORDER BY 1, 2'.format(counter=self.model._meta.db_table))
+            for kind, object_id in cursor.fetchall():
+                cursor.execute(
+                    'WITH folded AS ('
+                    'DELETE FROM {counter} WHERE kind = %s AND object_id = %s AND shard <> 0 RETURNING value), '
+                    'merged AS ('
+                    'INSERT INTO {counter} (kind, object_id, shard, value) '
+                    'SELECT %s, %s, 0, SUM(value) FROM folded HAVING COUNT(*) > 0 '
+                    'ON CONFLICT (kind, object_id, shard) DO UPDATE SET value = {counter}.value + EXCLUDED.value) '
+                    'SELECT COUNT(*) FROM folded'.format(counter=self.model._meta.db_table),
+                    [kind, object_id, kind, object_id])
+                folded += cursor.fetchone()[0]
+            # zero counters are locked in the same order as likes lock them
+            cursor.execute(
+                'DELETE FROM {counter} WHERE id IN ('
+                'SELECT id FROM {counter} WHERE shard = 0 AND value = 0 '
+                'ORDER BY kind COLLATE "C", object_id FOR UPDATE)'.format(counter=self.model._meta.db_table))
+        return folded
+
+    def rebuild(self):
+        """Recounts all counters from likes table, while blocking writes to it.
+        Needed after likes are inserted with bulk_create, which does not update counters"""
+
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute('LOCK TABLE {like} IN SHARE MODE'.format(like=Like._meta.db_table))
+            cursor.execute('DELETE FROM {counter}'.format(counter=self.model._meta.db_table))
+            for kind, column in ((LikeCounter.POST, 'related_post_id'), (LikeCounter.ACCOUNT, 'related_user_id')):
+                cursor.execute(
+                    'INSERT INTO {counter} (kind, object_id, shard, value) '
+                    'SELECT %s, {column}, 0, COUNT(*) FROM {like} GROUP BY {column}'.format(
+                        counter=self.model._meta.db_table, like=Like._meta.db_table, column=column), [kind])
+            VersionStamp.objects.bump([VersionStamp.ALL])
+
+
+class LikeCounter(models.Model):
+    """Shard of number of likes received by post, or given by account. Number of likes is sum of all shards.
+    Writers pick random shard, so likes of popular post do not wait for each other's row lock"""
+
+    POST = 'post'
+    ACCOUNT = 'account'
+    KINDS = (
+        (POST, 'Post'),
+        (ACCOUNT, 'Account'),
+    )
+
+    kind = models.CharField(max_length=7, choices=KINDS)
+    object_id = models.IntegerField()
+    shard = models.PositiveSmallIntegerField()
+    value = models.IntegerField(default=0)
+
+    objects = LikeCounterManager()
+
+    class Meta:
+        unique_together = (('kind', 'object_id', 'shard'),)
+
+    def __str__(self):
+        return '{} {} shard {}: {}'.format(self.kind, self.object_id, self.shard, self.value)
+
+
+class VersionStampManager(models.Manager):
+    def random_shard(self):
+        return random.randrange(settings.VERSION_STAMP_SHARDS)
+
+    def bump(self, keys):
+        """Increments versions of keys, in random shards, with single upsert"""
+
+        keys = sorted(set(keys))
+        if not keys:
+            return
+
+        # clock_timestamp, unlike now, differs between statements of the same transaction
+        shard = self.random_shard()
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {stamp} (key, shard, version, modified) VALUES {values} '
+                'ON CONFLICT (key, shard) DO UPDATE SET version = {stamp}.version + 1, '
+                'modified = EXCLUDED.modified'.format(
+                    stamp=self.model._meta.db_table, values=', '.join(['(%s, %s, 1, clock_timestamp())'] * len(keys))),
+                [param for key in keys for param in (key, shard)])
+
+    def current(self, key, related_keys=None):
+        """Returns (version, last modification time or None) of key, which also changes when ALL key is bumped,
+        or any of related_keys, a queryset of values of single column of keys, is bumped"""
+
+        condition = Q(key__in=[key, VersionStamp.ALL])
+        if related_keys is not None:
+            condition |= Q(key__in=related_keys)
+        stamp = self.filter(condition).aggregate(version=Sum('version'), modified=Max('modified'))
+        return stamp['version'] or 0, stamp['modified']
+
+
+class VersionStamp(models.Model):
+    """Shard of version of post, account or collection of them, used as validator of GET responses.
+    Version is sum of all shards, and it is incremented on every change which is visible in responses"""
+
+    # bumped when data is changed without going through ORM, e.g. by bulk loaders, to invalidate every response
+    ALL = 'all'
+    POSTS = 'posts'
+    ACCOUNTS = 'accounts'
+
+    key = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField()
+    version = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    objects = VersionStampManager()
+
+    class Meta:
+        unique_together = (('key', 'shard'),)
+
+    def __str__(self):
+        return '{} shard {}: {}'.format(self.key, self.shard, self.version)
+
+    @staticmethod
+    def post_key(pk):
+        return 'post:{}'.format(pk)
+
+    @staticmethod
+    def account_key(pk):
+        return 'account:{}'.format(pk)
+
+    @staticmethod
+    def post_author_keys(pk):
+        """Returns subquery of account key of post's author, whose username post shows"""
+
+        return Post.objects.filter(pk=pk).annotate(
+            author_key=Concat(Value('account:'), Cast('author_id', models.CharField()))).values('author_key')
+
+    @classmethod
+    def like_keys(cls, post_pk, user_pk):
+        """Keys changed by like or unlike: liked post, posts list, and details of liking account, with its likes number"""
+
+        return [cls.POSTS, cls.post_key(post_pk), cls.account_key(user_pk)]
+
+
+class EnrichmentJob(models.Model):
+    """Email verification and data enrichment of signed up account, run by enrichment_worker command"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name='enrichment_job')
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    date_time_updated = models.DateTimeField(auto_now=True)
+    error = models.TextField(default='', blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return '{} ({})'.format(self.account, self.status)
@@ -0,0 +1,110 @@
+import binascii
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset (cursor) pagination, with opaque cursors and without total count.
+    Ordering is taken from cursor_ordering attribute of the view, and it should be indexed column"""
+
+    ordering = 'pk'
+
+    def get_ordering(self, request, queryset, view):
+        """Returns ordering from view's cursor_ordering, or pk if view did not set it"""
+
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """Page number pagination by default. Client can opt-in to keyset pagination with ?pagination=cursor,
+    after which next and previous links carry the cursor"""
+
+    mode_query_param = 'pagination'
+    keyset_pagination_class = KeysetPagination
+
+    keyset_paginator = None
+
+    def use_keyset(self, request):
+        """Returns True if client asked for keyset pagination"""
+
+        return (request.query_params.get(self.mode_query_param) == 'cursor' or
+                self.keyset_pagination_class.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_keyset(request):
+            return super(PageNumberOrKeysetPagination, self).paginate_queryset(queryset, request, view)
+
+        self.keyset_paginator = self.keyset_pagination_class()
+        page = self.keyset_paginator.paginate_queryset(queryset, request, view)
+        self.display_page_controls = self.keyset_paginator.display_page_controls
+        return page
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super(PageNumberOrKeysetPagination, self).get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.to_html()
+        return super(PageNumberOrKeysetPagination, self).to_html()
+
+
+class RankedKeysetPagination(BasePagination):
+    """Keyset pagination of results ordered by descending rank annotation, with pk breaking ties.
+    Opaque cursor holds rank and pk of the last result of previous page, so pages do not use OFFSET"""
+
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            rank, pk = cursor
+            queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, pk__lt=pk))
+
+        results = list(queryset.order_by('-rank', '-pk')[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def decode_cursor(self, request):
+        """Returns (rank, pk) from cursor query parameter, or None if there is no cursor"""
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            rank, pk = b64decode(encoded.encode('ascii')).decode('ascii').split(' ')
+            return float(rank), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = b64encode('{!r} {}'.format(last.rank, last.pk).encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('first', self.get_first_link()),
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
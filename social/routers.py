@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# routing of current request's reads, set by ReplicaMiddleware
+routing = threading.local()
+
+# seconds since last transaction replayed by replica, or 0 if it replayed everything it received, or is not a replica.
+# NULL if replica does not stream from primary, as replica which lost primary has nothing to replay, but is stale.
+# Status of WAL receiver is visible to superusers and members of pg_read_all_stats
+LAG_SQL = '''
+SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+'''
+
+
+def replica_lag(alias):
+    """Returns replication lag of database alias in seconds, or None if it could not be reached,
+    or does not stream from primary"""
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    return float(lag) if lag is not None else None
+
+
+class ReplicaHealth:
+    """Lags of replicas, checked at most every REPLICA_LAG_CHECK_SECONDS per process. Replicas which lag more than
+    REPLICA_MAX_LAG_SECONDS, could not be reached, or do not stream from primary, are not used until next check"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.checked = {}
+        self.lags = {}
+
+    def healthy(self, aliases):
+        result = []
+        for alias in aliases:
+            now = self.clock()
+            with self.lock:
+                # only one thread checks, others use last known lag meanwhile
+                due = alias not in self.checked or now - self.checked[alias] >= settings.REPLICA_LAG_CHECK_SECONDS
+                if due:
+                    self.checked[alias] = now
+            if due:
+                lag = replica_lag(alias)
+                with self.lock:
+                    self.lags[alias] = lag
+            lag = self.lags.get(alias)
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS:
+                result.append(alias)
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.checked.clear()
+            self.lags.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+def pin_key(user_id):
+    return 'replica-pin:{}'.format(user_id)
+
+
+def pin_to_primary(user_id):
+    """Sends reads of user to primary for REPLICA_PIN_SECONDS, so user reads own writes"""
+
+    caches[settings.REPLICA_PIN_CACHE].set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    return caches[settings.REPLICA_PIN_CACHE].get(pin_key(user_id), False)
+
+
+def start_routing(read_from_replicas):
+    routing.read_from_replicas = read_from_replicas
+    routing.replica = None
+    routing.wrote = False
+
+
+def wrote():
+    """Returns True if current request wrote to database, whatever its method"""
+
+    return getattr(routing, 'wrote', False)
+
+
+def stop_routing():
+    start_routing(False)
+
+
+class ReplicaRouter:
+    """Sends reads of requests, which ReplicaMiddleware let read from replicas, to one healthy replica of
+    DATABASE_REPLICAS, the same for whole request, until request writes. Everything else, all writes, reads which
+    follow them, and reads of commands, workers and write requests, go to default database"""
+
+    def db_for_read(self, model, **hints):
+        if not getattr(routing, 'read_from_replicas', False) or wrote():
+            return None
+        if routing.replica is None:
+            replicas = replica_health.healthy(settings.DATABASE_REPLICAS)
+            routing.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        # ORM writes, and raw statements, which get their connection from router, mark request as writing,
+        # even if it is safe request, like GET of like_post
+        routing.wrote = True
+        # objects read from replica would otherwise be saved to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS} | set(settings.DATABASE_REPLICAS)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get schema from primary through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
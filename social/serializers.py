@@ -1,29 +1,122 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
-from rest_framework.reverse import reverse
 
 from .exceptions import PostTitleAlreadyExists
+from .links import link_builder
+from .metrics import record_serializer_time
 from .models import Account, Like, Post
 
 
-class AccountListSerializer(serializers.ModelSerializer):
+class TimedDataMixin:
+    """Records time spent in building serializer data, for metrics middleware"""
+
+    @property
+    def data(self):
+        start = time.perf_counter()
+        data = super(TimedDataMixin, self).data
+        record_serializer_time(time.perf_counter() - start)
+        return data
+
+
+@lru_cache(maxsize=None)
+def readable_fields(serializer_class):
+    """Returns names of fields, which serializer_class shows in responses"""
+
+    return frozenset(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+def selected_fields(request, serializer_class):
+    """Returns names of fields of serializer_class, selected with ?fields= or ?omit= comma separated lists
+    in query of safe request, or None if all fields are selected. Raises ValidationError for unknown fields"""
+
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if not fields and not omit:
+        return None
+
+    available = readable_fields(serializer_class)
+    selected = set(fields.split(',')) if fields else set(available)
+    omitted = set(omit.split(',')) if omit else set()
+    unknown = (selected | omitted) - available
+    if unknown:
+        raise serializers.ValidationError({'fields': 'Unknown fields: ' + ', '.join(sorted(unknown))})
+    return selected - omitted
+
+
+class SparseFieldsMixin:
+    """Removes fields which are not selected with ?fields= or ?omit= query parameters of request in context,
+    so they are not computed. Also removes link_fields, {field: url name}, if view puts their URI templates
+    in paginated response, and sets link_templates in context"""
+
+    link_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super(SparseFieldsMixin, self).__init__(*args, **kwargs)
+        fields = selected_fields(self.context.get('request'), type(self))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        if self.context.get('link_templates'):
+            for name in self.link_fields:
+                self.fields.pop(name, None)
+
+    def link(self, field, obj):
+        """Returns absolute link of link field for obj"""
+
+        return link_builder(self.context).url(self.link_fields[field], obj.pk)
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class PostListSerializer(TimedListSerializer):
+    """Finds which posts of the page current user liked, with one query, for has_liked of every post"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        user = self.context['request'].user if 'request' in self.context else None
+        if 'has_liked' in self.child.fields and user is not None and user.is_authenticated:
+            self.context['liked_post_pks'] = set(Like.objects.filter(
+                related_user_id=user.pk, related_post_id__in=[post.pk for post in posts]).values_list(
+                'related_post_id', flat=True))
+        return super(PostListSerializer, self).to_representation(posts)
+
+
+class TimedModelSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """Model serializer, which records its time. Meta of subclasses should set list_serializer_class
+    to TimedListSerializer, so lists are timed as well"""
+
+
+class AccountListSerializer(SparseFieldsMixin, TimedModelSerializer):
     email = serializers.EmailField(required=True)
-    password = serializers.CharField(style={'input_type': 'password'})
+    # extra_kwargs do not apply to declared fields
+    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
 
     account = serializers.SerializerMethodField()
 
+    link_fields = {'account': 'accounts-read-details'}
+
     class Meta:
         model = Account
-        fields = ('id', 'username', 'first_name', 'last_name', 'email', 'password', 'account')
-        extra_kwargs = {'password': {'write_only': True}}
+        list_serializer_class = TimedListSerializer
+        fields = ('id', 'username', 'first_name', 'last_name', 'email', 'password', 'enrichment_status', 'account')
+        extra_kwargs = {'password': {'write_only': True}, 'enrichment_status': {'read_only': True}}
 
     def get_account(self, obj):
         """Returns link to account details"""
 
-        return reverse('accounts-read-details', args=[obj.pk], request=self.context['request'])
+        return self.link('account', obj)
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsMixin, TimedModelSerializer):
     like_post = serializers.SerializerMethodField()
     unlike_post = serializers.SerializerMethodField()
     likes_number = serializers.SerializerMethodField()
@@ -31,6 +124,9 @@ class PostSerializer(serializers.ModelSerializer):
     post_content = serializers.CharField(required=True)
     author = serializers.StringRelatedField(read_only=True)
     edit_post = serializers.SerializerMethodField()
+    has_liked = serializers.SerializerMethodField()
+
+    link_fields = {'like_post': 'posts-like-post', 'unlike_post': 'posts-unlike-post', 'edit_post': 'posts-detail'}
 
     def create(self, validated_data):
         """Creates post if post_title does not exists, and assign post author to current, logged in user"""
@@ -42,49 +138,90 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ('like_post', 'unlike_post', 'id', 'post_title', 'post_content', 'author', 'likes_number', 'edit_post')
+        list_serializer_class = PostListSerializer
+        fields = ('like_post', 'unlike_post', 'id', 'post_title', 'post_content', 'author', 'likes_number', 'edit_post',
+                  'has_liked')
 
     def get_likes_number(self, obj):
-        """Returns number of likes for post"""
+        """Returns number of likes for post, using likes_number annotation if queryset provided it"""
 
+        if hasattr(obj, 'likes_number'):
+            return obj.likes_number
         return obj.likes.count()
 
+    def get_has_liked(self, obj):
+        """Returns True if current user liked the post, using liked posts of the page if list serializer found them"""
+
+        if 'liked_post_pks' in self.context:
+            return obj.pk in self.context['liked_post_pks']
+        user = self.context['request'].user if 'request' in self.context else None
+        # users can not like their own posts, e.g. ones they have just created
+        if user is None or not user.is_authenticated or obj.author_id == user.pk:
+            return False
+        return Like.objects.filter(related_user_id=user.pk, related_post_id=obj.pk).exists()
+
     def get_like_post(self, obj):
         """Returns link for post like"""
 
-        return reverse('posts-like-post', args=[obj.pk], request=self.context['request'])
+        return self.link('like_post', obj)
 
     def get_unlike_post(self, obj):
         """Return link for post unlike"""
 
-        return reverse('posts-unlike-post', args=[obj.pk], request=self.context['request'])
+        return self.link('unlike_post', obj)
 
     def get_edit_post(self, obj):
         """Return post details"""
 
-        return reverse('posts-detail', args=[obj.pk], request=self.context['request'])
+        return self.link('edit_post', obj)
 
 
-class AccountDetailsSerializer(serializers.ModelSerializer):
+class AccountDetailsSerializer(SparseFieldsMixin, TimedModelSerializer):
     email = serializers.EmailField(required=True)
-    password = serializers.CharField(style={'input_type': 'password'})
-    posts = serializers.StringRelatedField(many=True, read_only=True)
+    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
+    posts = serializers.SerializerMethodField()
+    all_posts = serializers.SerializerMethodField()
     likes_number = serializers.SerializerMethodField()
 
     user_details = serializers.JSONField(read_only=True)
 
+    link_fields = {'all_posts': 'accounts-posts'}
+
     class Meta:
         model = Account
+        list_serializer_class = TimedListSerializer
         fields = (
-            'id', 'username', 'first_name', 'last_name', 'email', 'password', 'posts', 'likes_number', 'user_details')
+            'id', 'username', 'first_name', 'last_name', 'email', 'password', 'posts', 'all_posts', 'likes_number',
+            'enrichment_status', 'user_details')
+        read_only_fields = ('enrichment_status',)
+
+    def __init__(self, *args, include_user_details=True, **kwargs):
+        super(AccountDetailsSerializer, self).__init__(*args, **kwargs)
+        if not include_user_details:
+            self.fields.pop('user_details', None)
+
+    def get_posts(self, obj):
+        """Returns titles of most recent posts, using recent_post_titles annotation if queryset provided it"""
+
+        if hasattr(obj, 'recent_post_titles'):
+            return obj.recent_post_titles
+        posts = obj.posts.order_by('-date_time_created', '-pk')[:settings.ACCOUNT_RECENT_POSTS]
+        return list(posts.values_list('post_title', flat=True))
+
+    def get_all_posts(self, obj):
+        """Returns link to paginated list of all posts of account"""
+
+        return self.link('all_posts', obj)
 
     def get_likes_number(self, obj):
-        """Returns number of likes per user"""
+        """Returns number of likes per user, using likes_number annotation if queryset provided it"""
 
+        if hasattr(obj, 'likes_number'):
+            return obj.likes_number
         return obj.likes.count()
 
 
-class LikeSerializer(serializers.ModelSerializer):
+class LikeSerializer(SparseFieldsMixin, TimedModelSerializer):
     related_user = serializers.StringRelatedField(read_only=True)
 
     def create(self, validated_data):
@@ -98,4 +235,5 @@ class LikeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Like
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
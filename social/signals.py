@@ -0,0 +1,80 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .models import Account, Like, LikeCounter, Post, VersionStamp
+
+
+@receiver(pre_save, sender=Like)
+def remember_counted_like(sender, instance, using, **kwargs):
+    """Remembers post and user, which like saved through ORM is counted for, so count_saved_like can move its counts"""
+
+    instance.counted_for = None
+    if instance.pk is not None:
+        instance.counted_for = sender.objects.using(using).filter(pk=instance.pk).values_list(
+            'related_post_id', 'related_user_id').first()
+
+
+@receiver(post_save, sender=Like)
+def count_saved_like(sender, instance, created, **kwargs):
+    """Updates like counters and version stamps for likes created through ORM, or moved to other post or user"""
+
+    liked = (instance.related_post_id, instance.related_user_id)
+    counted_for = None if created else getattr(instance, 'counted_for', None)
+    if not created and counted_for in (None, liked):
+        return
+
+    changes = [(LikeCounter.POST, liked[0], 1), (LikeCounter.ACCOUNT, liked[1], 1)]
+    keys = VersionStamp.like_keys(*liked)
+    if counted_for is not None:
+        changes += [(LikeCounter.POST, counted_for[0], -1), (LikeCounter.ACCOUNT, counted_for[1], -1)]
+        keys += VersionStamp.like_keys(*counted_for)
+    LikeCounter.objects.add(changes)
+    VersionStamp.objects.bump(keys)
+
+
+@receiver(post_delete, sender=Like)
+def count_deleted_like(sender, instance, **kwargs):
+    """Updates like counters and version stamps for likes deleted through ORM"""
+
+    LikeCounter.objects.add([(LikeCounter.POST, instance.related_post_id, -1),
+                             (LikeCounter.ACCOUNT, instance.related_user_id, -1)])
+    VersionStamp.objects.bump(VersionStamp.like_keys(instance.related_post_id, instance.related_user_id))
+
+
+@receiver(post_save, sender=Post)
+def stamp_saved_post(sender, instance, **kwargs):
+    """Bumps versions of the post, posts list, and details of its author, which show post titles"""
+
+    VersionStamp.objects.bump([VersionStamp.POSTS, VersionStamp.post_key(instance.pk),
+                               VersionStamp.account_key(instance.author_id)])
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_counters(sender, instance, **kwargs):
+    LikeCounter.objects.filter(kind=LikeCounter.POST, object_id=instance.pk).delete()
+    stamp_saved_post(sender, instance)
+
+
+@receiver(post_save, sender=Account)
+def stamp_saved_account(sender, instance, update_fields=None, **kwargs):
+    """Bumps versions of the account, accounts list, and posts list, which shows authors' usernames.
+    Saving only last_login, which is done on every log in, is not visible in responses"""
+
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    VersionStamp.objects.bump([VersionStamp.ACCOUNTS, VersionStamp.account_key(instance.pk), VersionStamp.POSTS])
+
+
+@receiver(post_delete, sender=Account)
+def delete_account_counters(sender, instance, **kwargs):
+    LikeCounter.objects.filter(kind=LikeCounter.ACCOUNT, object_id=instance.pk).delete()
+    stamp_saved_account(sender, instance)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def forget_changed_account(sender, instance, **kwargs):
+    """Removes cached snapshot of account, used by JWT authentication"""
+
+    forget_user(instance.pk)
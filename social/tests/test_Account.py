@@ -1,7 +1,17 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 
-from ..models import Account
+from ..enrichment import FakeProvider, claim_jobs, run_jobs
+from ..models import Account, EnrichmentJob, Like, Post
+
+FAKE_PROVIDER = 'social.enrichment.FakeProvider'
 
 
 class TestAccountListViewSet(APITestCase):
@@ -19,14 +29,123 @@ class TestAccountListViewSet(APITestCase):
 
         self.assertEquals(response.status_code, 201)
 
+    @override_settings(ENRICHMENT_VERIFIER=FAKE_PROVIDER, ENRICHMENT_ENRICHER=FAKE_PROVIDER)
     def test_account_list_view_set_POST_fake_email(self):
         data = self.data.copy()
-        data['email'] = 'testmail@gmadsdkil.com'
+        data['email'] = 'testmail@gmadsdkil.invalid'
         response = self.client.post(self.url, data=data, format='json')
 
-        self.assertEquals(response.status_code, 400)
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(response.data['enrichment_status'], Account.ENRICHMENT_PENDING)
+
+        call_command('enrichment_worker', '--once', stdout=StringIO())
+        user = Account.objects.get(username='test_user')
+        self.assertEquals(user.enrichment_status, Account.ENRICHMENT_REJECTED)
+        self.assertFalse(user.is_active)
+
+    @override_settings(ENRICHMENT_VERIFIER=FAKE_PROVIDER, ENRICHMENT_ENRICHER=FAKE_PROVIDER)
+    def test_account_list_view_set_POST_enrichment_job(self):
+        response = self.client.post(self.url, data=self.data, format='json')
+        self.assertEquals(response.status_code, 201)
+
+        call_command('enrichment_worker', '--once', stdout=StringIO())
+        user = Account.objects.get(username='test_user')
+        self.assertEquals(user.enrichment_status, Account.ENRICHMENT_DONE)
+        self.assertEquals(user.user_details['email'], 'testmail@gmail.com')
+        self.assertEquals(user.enrichment_job.status, EnrichmentJob.DONE)
+
+    def test_enrichment_job_is_retried_when_provider_fails(self):
+        user = Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
+        job = EnrichmentJob.objects.create(account=user)
+        verifier = mock.Mock()
+        verifier.verify.side_effect = ConnectionError
+
+        run_jobs(claim_jobs(10), verifier, FakeProvider(), concurrency=2)
+        job.refresh_from_db()
+        self.assertEquals(job.status, EnrichmentJob.QUEUED)
+        self.assertEquals(job.attempts, 1)
+        self.assertEquals(claim_jobs(10), [])
 
     def test_account_list_view_set_POST_user_already_exists(self):
         Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
         response = self.client.post(self.url, data=self.data, format='json')
         self.assertEquals(response.status_code, 400)
+
+    def test_account_read_details_query_count_does_not_depend_on_number_of_posts(self):
+        user = Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
+        other_user = Account.objects.create_user(username='other_user', email='other@gmail.com',
+                                                 password='test_password')
+        url = reverse('accounts-read-details', args=[user.pk])
+        Like.objects.create(related_post=Post.objects.create(post_title='title', author=other_user), related_user=user)
+        with CaptureQueriesContext(connection) as one_post:
+            self.client.get(url)
+
+        for i in range(10):
+            Post.objects.create(post_title='title ' + str(i), author=user)
+        with CaptureQueriesContext(connection) as many_posts:
+            response = self.client.get(url)
+
+        self.assertEquals(len(response.data['posts']), 10)
+        self.assertEquals(response.data['likes_number'], 1)
+        self.assertEquals(len(one_post), len(many_posts))
+
+    @override_settings(ACCOUNT_RECENT_POSTS=3)
+    def test_account_read_details_embeds_most_recent_posts_in_single_query(self):
+        user = Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
+        user.user_details = {'person': {'bio': 'long'}}
+        user.save()
+        for i in range(5):
+            Post.objects.create(post_title='title ' + str(i), author=user)
+        url = reverse('accounts-read-details', args=[user.pk])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEquals(response.data['posts'], ['title 4', 'title 3', 'title 2'])
+        self.assertEquals(response.data['all_posts'], 'http://testserver' + reverse('accounts-posts', args=[user.pk]))
+        self.assertNotIn('user_details', response.data)
+        self.assertEquals(self.client.get(url, {'include': 'user_details'}).data['user_details'],
+                          {'person': {'bio': 'long'}})
+
+    def test_account_posts_are_paginated(self):
+        user = Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
+        other_user = Account.objects.create_user(username='other_user', email='other@gmail.com',
+                                                 password='test_password')
+        Post.objects.create(post_title='other title', author=other_user)
+        for i in range(45):
+            Post.objects.create(post_title='title ' + str(i), author=user)
+        url = reverse('accounts-posts', args=[user.pk])
+
+        first_page = self.client.get(url)
+        self.assertEquals(first_page.data['count'], 45)
+        self.assertEquals(first_page.data['results'][0]['post_title'], 'title 44')
+
+        second_page = self.client.get(self.client.get(url, {'pagination': 'cursor'}).data['next'])
+        self.assertEquals([post['post_title'] for post in second_page.data['results']],
+                          ['title 4', 'title 3', 'title 2', 'title 1', 'title 0'])
+        self.assertEquals(self.client.get(reverse('accounts-posts', args=[other_user.pk + 1])).status_code, 404)
+
+    def test_account_posts_of_invalid_id_are_not_found(self):
+        for pk in ('abc', 2 ** 31):
+            self.assertEquals(self.client.get(reverse('accounts-posts', args=[pk])).status_code, 404)
+            self.assertEquals(self.client.get(reverse('accounts-read-details', args=[pk])).status_code, 404)
+
+    def test_account_read_details_sparse_fields(self):
+        user = Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('accounts-read-details', args=[user.pk]), {'fields': 'id,username'})
+
+        self.assertEquals(response.data, {'id': user.pk, 'username': 'test_user'})
+        self.assertNotIn('social_likecounter', queries[-1]['sql'])
+        self.assertNotIn('ARRAY', queries[-1]['sql'])
+
+    def test_write_only_fields_can_not_be_selected(self):
+        user = Account.objects.create_user(username='test_user', email='testmail@gmail.com', password='test_password')
+
+        for url in (reverse('accounts-read-details', args=[user.pk]), reverse('accounts-list')):
+            response = self.client.get(url, {'fields': 'password'})
+            self.assertEquals(response.status_code, 400)
+            response = self.client.get(url, {'fields': 'username,password'})
+            self.assertEquals(response.status_code, 400)
+            self.assertNotIn(b'pbkdf2', response.content)
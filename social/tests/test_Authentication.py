@@ -0,0 +1,44 @@
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..authentication import user_cache_stats
+from ..models import Account, Post
+
+
+class TestCachedJWTAuthentication(APITestCase):
+    def setUp(self):
+        caches['users'].clear()
+        user_cache_stats.reset()
+        self.client = APIClient()
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(self.user)))
+        self.url = reverse('posts-list')
+
+    def test_user_is_loaded_once(self):
+        self.client.post(self.url, {'post_title': 'first', 'post_content': 'content'})
+
+        with self.assertNumQueries(4):
+            response = self.client.post(self.url, {'post_title': 'second', 'post_content': 'content'})
+
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(response.data['author'], 'test_user')
+        self.assertEquals(Post.objects.get(post_title='second').author, self.user)
+        self.assertEquals(user_cache_stats.as_dict()['user'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_deactivated_account_is_rejected(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.post(self.url, {'post_title': 'title', 'post_content': 'content'})
+
+        self.assertEquals(response.status_code, 403)
+
+    def test_deleted_account_is_rejected(self):
+        self.client.get(self.url)
+        self.user.delete()
+
+        self.assertEquals(self.client.get(self.url).status_code, 403)
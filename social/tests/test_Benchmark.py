@@ -0,0 +1,33 @@
+import random
+
+from django.db.models import F
+from django.test import TestCase
+
+from ..benchmarking import ROUTES, SERIALIZATION_MODES, measure_serialization, run, seed
+from ..models import Account, Like
+
+
+class TestBenchmark(TestCase):
+    def test_run_reports_latency_and_queries_for_every_route(self):
+        rng = random.Random(42)
+        dataset = seed(number_of_users=10, posts_per_user=2, number_of_likes=50, skew=1.1, rng=rng)
+
+        self.assertEquals(Account.objects.count(), 10)
+        self.assertFalse(Like.objects.filter(related_post__author_id=F('related_user_id')).exists())
+
+        report = run(ROUTES, dataset, number_of_requests=5, rng=rng, warmup=1)
+        self.assertEquals(set(report), set(ROUTES))
+        for route in ROUTES:
+            self.assertEquals(report[route]['requests'], 5)
+            self.assertGreater(report[route]['queries_per_request'], 0)
+            self.assertLessEqual(report[route]['p50_ms'], report[route]['p99_ms'])
+        self.assertEquals(report['posts-list']['status_codes'], {'200': 5})
+
+    def test_measure_serialization_of_every_mode(self):
+        seed(number_of_users=5, posts_per_user=4, number_of_likes=10, skew=1.1, rng=random.Random(42))
+
+        report = measure_serialization(10, repeat=2)
+        self.assertEquals(set(report), set(SERIALIZATION_MODES))
+        for mode in SERIALIZATION_MODES:
+            self.assertEquals(report[mode]['rows'], 10)
+            self.assertGreater(report[mode]['us_per_row'], 0)
@@ -0,0 +1,221 @@
+import base64
+import io
+import json
+import random
+import time
+from unittest import mock
+
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from faker import Factory
+
+from ..bot.direct import DirectLoader
+from ..bot.records import Post as PostRecord, User
+from ..bot.scheduler import LikeScheduler
+from ..bot.tokens import TokenError, TokenManager
+from ..bot.trace import TraceRecorder, credentials, read_trace, replay, schedule
+from ..management.commands.social_bot import Command as SocialBotCommand
+from ..models import Account, Like, Post
+
+
+class TestLikeScheduler(SimpleTestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+        self.max_likes_per_user = 5
+        self.users = []
+        for i in range(300):
+            user = User('user ' + str(i), 'password')
+            for j in range(self.random.randrange(1, 5)):
+                user.posts.append(PostRecord('title {} {}'.format(i, j), 'content', user, ''))
+            self.users.append(user)
+
+    def test_plan_follows_like_rules(self):
+        scheduler = LikeScheduler(self.users, self.max_likes_per_user, rng=self.random)
+        zero_like_posts = {user: len(user.posts) for user in self.users}
+        liked_posts = set()
+        likes = set()
+        previous_user = None
+
+        for user, post in scheduler.plan():
+            if user is not previous_user:
+                # user with most posts goes first, and candidates are taken at the start of his turn
+                if previous_user is not None:
+                    self.assertLessEqual(len(user.posts), len(previous_user.posts))
+                candidate_authors = {author for author, number in zero_like_posts.items() if number > 0}
+                previous_user = user
+
+            self.assertIsNot(post.user, user)
+            self.assertIn(post.user, candidate_authors)
+            self.assertNotIn((user, post), likes)
+            likes.add((user, post))
+            if post not in liked_posts:
+                liked_posts.add(post)
+                zero_like_posts[post.user] -= 1
+
+        for user in self.users:
+            self.assertLessEqual(user.likes, self.max_likes_per_user)
+            self.assertEqual(user.likes, len(user.liked_posts))
+        self.assertEqual(sum(post.likes_number for user in self.users for post in user.posts), len(likes))
+
+    def test_plan_stops_when_there_are_no_posts_with_zero_likes(self):
+        scheduler = LikeScheduler(self.users, self.max_likes_per_user, rng=self.random)
+        list(scheduler.plan())
+
+        users_that_can_like = [user for user in self.users if scheduler.can_like(user)]
+        posts_with_zero_likes = [post for user in self.users for post in user.posts if post.likes_number == 0]
+        if users_that_can_like:
+            next_user = min(users_that_can_like, key=lambda user: (-len(user.posts), self.users.index(user)))
+            self.assertTrue(all(post.user is next_user for post in posts_with_zero_likes))
+
+    def test_failed_likes_are_not_offered_again(self):
+        scheduler = LikeScheduler(self.users, self.max_likes_per_user, rng=self.random)
+        user, posts = scheduler.next_turn()
+        scheduler.complete_turn(user, [], posts)
+
+        turn = scheduler.next_turn()
+        if turn is not None and turn[0] is user:
+            self.assertFalse(set(posts) & set(turn[1]))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TestDirectLoader(TestCase):
+    def test_load_creates_planned_users_posts_and_likes(self):
+        loader = DirectLoader(Factory.create(), random.Random(42), batch_size=7, processes=2)
+        users, likes = loader.plan(number_of_users=30, max_posts_per_user=5, max_likes_per_user=3)
+
+        self.assertEquals(loader.load(users, likes), (30, sum(len(user.posts) for user in users), len(likes)))
+        self.assertEquals(Account.objects.count(), 30)
+        self.assertEquals(Like.objects.count(), len(likes))
+        self.assertFalse(Like.objects.filter(related_post__author=F('related_user')).exists())
+
+        user = users[0]
+        self.assertTrue(Account.objects.get(pk=user.pk).check_password(user.password))
+        self.assertEquals(Post.objects.filter(author_id=user.pk).count(), len(user.posts))
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def fake_token(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode()).decode().rstrip('=')
+    return 'header.{}.signature'.format(payload)
+
+
+class TestTokenManager(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000
+        self.sleeps = []
+        self.session = mock.Mock()
+        self.manager = TokenManager('/token', '/token/refresh', leeway=30, max_attempts=3, rng=random.Random(1),
+                                    clock=lambda: self.now, sleep=self.sleeps.append)
+        self.user = User('user', 'password')
+
+    def test_token_is_refreshed_shortly_before_it_expires(self):
+        self.session.post.side_effect = [FakeResponse(200, {'access': fake_token(1300), 'refresh': 'refresh'}),
+                                         FakeResponse(200, {'access': fake_token(1600)})]
+
+        self.manager.headers(self.user, self.session)
+        self.now = 1200
+        self.manager.headers(self.user, self.session)
+        self.now = 1280
+        headers = self.manager.headers(self.user, self.session)
+
+        self.assertEquals(headers, {'Authorization': 'Bearer ' + fake_token(1600)})
+        self.assertEquals([call[0][0] for call in self.session.post.call_args_list], ['/token', '/token/refresh'])
+        self.assertEquals(self.session.post.call_args[1]['data'], {'refresh': 'refresh'})
+
+    def test_expired_refresh_token_logs_in_again(self):
+        self.user.token, self.user.token_expires, self.user.refresh_token = fake_token(900), 900, 'expired'
+        self.session.post.side_effect = [FakeResponse(401), FakeResponse(200, {'access': fake_token(1300),
+                                                                               'refresh': 'refresh'})]
+
+        self.manager.headers(self.user, self.session)
+
+        self.assertEquals(self.user.token_expires, 1300)
+        self.assertEquals(self.user.refresh_token, 'refresh')
+
+    def test_retries_are_bounded_with_growing_backoff(self):
+        self.session.post.side_effect = [FakeResponse(503), OSError('connection refused'), FakeResponse(500)]
+
+        with self.assertRaises(TokenError):
+            self.manager.log_in(self.user, self.session)
+
+        self.assertEquals(self.session.post.call_count, 3)
+        self.assertEquals(len(self.sleeps), 2)
+        self.assertLessEqual(self.sleeps[0], 0.5)
+        self.assertLessEqual(self.sleeps[1], 1)
+
+
+class FakeBulkSession:
+    """Answers bulk post requests, reporting titles in taken as already existing"""
+
+    def __init__(self, taken):
+        self.taken = taken
+        self.sent = []
+
+    def post(self, url, data=None, json=None, headers=None, user=None):
+        self.sent.append(json)
+        results = [{'status': 400, 'errors': {}} if item['post_title'] in self.taken else
+                   {'status': 201, 'data': {'like_post': 'like ' + item['post_title']}} for item in json]
+        return FakeResponse(207 if any(result['status'] == 400 for result in results) else 201, {'results': results})
+
+
+class TestBotCreatePost(SimpleTestCase):
+    def test_posts_with_taken_titles_are_sent_again(self):
+        command = SocialBotCommand()
+        command.faker = mock.Mock()
+        command.faker.sentence.side_effect = ['title 1', 'taken', 'title 2', 'title 3']
+        command.faker.text.return_value = 'content'
+        command.max_posts_per_user = 10
+        command.tokens = mock.Mock()
+        command.tokens.headers.return_value = {'Authorization': 'Bearer token'}
+        session = FakeBulkSession({'taken'})
+        user = User('user', 'password')
+
+        with mock.patch('random.randrange', return_value=3):
+            command.create_post(user, session)
+
+        self.assertEquals([len(items) for items in session.sent], [3, 1])
+        self.assertEquals([post.title for post in user.posts], ['title 1', 'title 2', 'title 3'])
+        self.assertEquals(user.posts[0].like_link, 'like title 1')
+
+
+class TestTrace(SimpleTestCase):
+    def test_recorded_trace_is_read_back_in_order(self):
+        file = io.StringIO()
+        times = iter([0, 2, 1])
+        recorder = TraceRecorder(file, clock=lambda: next(times))
+        user = User('user', 'password')
+        recorder.record('post', 'http://localhost:8000/api/token', {'username': 'user', 'password': 'password'},
+                        None, 2, 200, 0.1)
+        recorder.record('post', 'http://localhost:8000/api/posts/5/like_post/', None, user, 1, 201, 0.01)
+
+        file.seek(0)
+        records = read_trace(file)
+
+        self.assertEquals([record['endpoint'] for record in records], ['posts-like-post', 'token_obtain_pair'])
+        self.assertEquals(records[0]['user'], 'user')
+        self.assertEquals(credentials(records), {'user': 'password'})
+        self.assertEquals(schedule(records, speed=2), [0.5, 1])
+        self.assertEquals(schedule(records, rate=4), [0, 0.25])
+
+    def test_replay_response_time_includes_waiting_for_worker(self):
+        records = [{'endpoint': 'posts-list'}] * 10
+
+        def send(record):
+            time.sleep(0.02)
+            return 200
+
+        results, elapsed = replay(records, schedule(records, rate=200), send, concurrency=1)
+        report = results['posts-list'].as_dict(elapsed)
+
+        self.assertEquals(report['requests'], 10)
+        self.assertEquals(report['error_rate'], 0)
+        self.assertEquals(report['response_time_histogram']['+Inf'], 10)
+        self.assertGreater(report['response_time']['max_ms'], 3 * report['service_time']['max_ms'])
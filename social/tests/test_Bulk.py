@@ -0,0 +1,105 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..models import Account, Like, LikeCounter, Post, VersionStamp
+
+
+class TestBulkPosts(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('posts-bulk')
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.client.force_authenticate(self.user)
+
+    def test_creates_all_posts(self):
+        data = [{'post_title': 'title {}'.format(i), 'post_content': 'content'} for i in range(5)]
+        version = VersionStamp.objects.current(VersionStamp.POSTS)[0]
+
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals([result['status'] for result in response.data['results']], [201] * 5)
+        self.assertEquals([result['data']['post_title'] for result in response.data['results']],
+                          [item['post_title'] for item in data])
+        self.assertEquals(response.data['results'][0]['data']['author'], 'test_user')
+        self.assertEquals(response.data['results'][0]['data']['likes_number'], 0)
+        self.assertEquals(Post.objects.filter(author=self.user).count(), 5)
+        self.assertGreater(VersionStamp.objects.current(VersionStamp.POSTS)[0], version)
+
+    def test_invalid_and_taken_titles_are_reported_per_item(self):
+        Post.objects.create(post_title='taken', post_content='content', author=self.user)
+        data = [{'post_title': 'new', 'post_content': 'content'},
+                {'post_title': 'taken', 'post_content': 'content'},
+                {'post_title': 'new', 'post_content': 'other content'},
+                {'post_title': 'no content'}]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEquals(response.status_code, 207)
+        results = response.data['results']
+        self.assertEquals([result['status'] for result in results], [201, 400, 400, 400])
+        self.assertEquals(results[1]['errors'], {'post_title': ['Post with that title already exists']})
+        self.assertEquals(results[2]['errors'], {'post_title': ['Duplicate of item 0']})
+        self.assertIn('post_content', results[3]['errors'])
+        self.assertEquals(Post.objects.count(), 2)
+
+    def test_created_posts_are_searchable(self):
+        self.client.post(self.url, [{'post_title': 'bulk', 'post_content': 'searchable words'}], format='json')
+        self.assertEquals(Post.objects.search('searchable').count(), 1)
+
+    @override_settings(BULK_MAX_ITEMS=2)
+    def test_malformed_requests_are_rejected(self):
+        item = {'post_title': 'title', 'post_content': 'content'}
+        for data in ([], [item] * 3, item, [item, 'title']):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEquals(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    def test_anonymous_user_can_not_create_posts(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, [{'post_title': 'title', 'post_content': 'content'}], format='json')
+        self.assertEquals(response.status_code, 403)
+
+
+class TestBulkLikes(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('likes-bulk')
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.author = Account.objects.create_user(username='author', email='testmail@gmail.com',
+                                                  password='test_password')
+        self.posts = [Post.objects.create(post_title='title {}'.format(i), post_content='content', author=self.author)
+                      for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def test_likes_all_posts(self):
+        data = [{'related_post': post.pk} for post in self.posts]
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals([result['data']['related_post'] for result in response.data['results']],
+                          [post.pk for post in self.posts])
+        self.assertEquals(Like.objects.filter(related_user=self.user).count(), 3)
+
+        counted = Post.objects.count_likes().filter(pk=self.posts[0].pk).get()
+        self.assertEquals(counted.likes_number, 1)
+        self.assertEquals(sum(LikeCounter.objects.filter(kind=LikeCounter.ACCOUNT, object_id=self.user.pk)
+                              .values_list('value', flat=True)), 3)
+
+    def test_likes_which_can_not_be_made_are_reported_per_item(self):
+        Like.objects.create(related_post=self.posts[1], related_user=self.user)
+        own_post = Post.objects.create(post_title='own', post_content='content', author=self.user)
+        data = [{'related_post': self.posts[0].pk}, {'related_post': self.posts[1].pk},
+                {'related_post': own_post.pk}, {'related_post': 2 ** 31 - 1}, {'related_post': 'x'},
+                {'related_post': self.posts[0].pk}]
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEquals(response.status_code, 207)
+        results = response.data['results']
+        self.assertEquals([result['status'] for result in results], [201, 405, 405, 404, 400, 400])
+        self.assertEquals(results[1]['errors'], {'error': 'Already liked this post'})
+        self.assertEquals(results[2]['errors'], {'error': 'You can not like your own post'})
+        self.assertEquals(results[5]['errors'], {'related_post': ['Duplicate of item 0']})
+        self.assertEquals(Like.objects.filter(related_user=self.user).count(), 2)
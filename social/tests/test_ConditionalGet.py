@@ -0,0 +1,78 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..models import Account, Post
+
+
+class TestConditionalGet(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = Account.objects.create_user(username='author', email='author@gmail.com', password='password')
+        self.user = Account.objects.create_user(username='user', email='user@gmail.com', password='password')
+        self.post = Post.objects.create(post_title='title', post_content='content', author=self.author)
+        self.posts_url = reverse('posts-list')
+        self.post_url = reverse('posts-detail', args=[self.post.pk])
+
+    def test_matching_etag_returns_304_with_single_query(self):
+        etag = self.client.get(self.posts_url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.posts_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response.content, b'')
+
+    def test_like_changes_etag_of_post_posts_list_and_liking_account(self):
+        urls = [self.posts_url, self.post_url, reverse('accounts-read-details', args=[self.user.pk])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        self.client.force_authenticate(self.user)
+        self.client.post(self.post_url + 'like_post/')
+
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEquals(response.status_code, 200)
+            self.assertNotEquals(response['ETag'], etag)
+
+    def test_post_edit_changes_etag(self):
+        # etags of posts include user, as has_liked depends on it
+        self.client.force_authenticate(self.author)
+        etag = self.client.get(self.post_url)['ETag']
+        other_post_etag = self.client.get(
+            reverse('posts-detail', args=[Post.objects.create(post_title='other', post_content='content',
+                                                              author=self.user).pk]))['ETag']
+
+        self.client.patch(self.post_url, {'post_content': 'edited'})
+
+        self.assertEquals(self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEquals(self.client.get(reverse('posts-detail', args=[self.post.pk + 1]),
+                                          HTTP_IF_NONE_MATCH=other_post_etag).status_code, 304)
+
+    def test_author_rename_changes_etag_of_post(self):
+        etag = self.client.get(self.post_url)['ETag']
+        other_post_url = reverse('posts-detail', args=[
+            Post.objects.create(post_title='other', post_content='content', author=self.user).pk])
+        other_post_etag = self.client.get(other_post_url)['ETag']
+
+        self.author.username = 'renamed'
+        self.author.save()
+
+        response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.data['author'], 'renamed')
+        self.assertEquals(self.client.get(other_post_url, HTTP_IF_NONE_MATCH=other_post_etag).status_code, 304)
+
+    def test_if_modified_since(self):
+        response = self.client.get(reverse('accounts-list'))
+
+        self.assertEquals(
+            self.client.get(reverse('accounts-list'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+            304)
+
+    def test_log_in_does_not_change_etag(self):
+        url = reverse('accounts-detail', args=[self.user.pk])
+        etag = self.client.get(url)['ETag']
+
+        self.client.login(username='user', password='password')
+
+        self.assertEquals(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from ..caching import CacheStats
+from ..enrichment import CachedEnricher, CachedVerifier, FakeProvider
+
+
+class TestCachedProviders(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache('enrichment-tests', {})
+        self.stats = CacheStats()
+        self.provider = mock.Mock(wraps=FakeProvider())
+
+    def test_verifier_caches_result_per_email(self):
+        verifier = CachedVerifier(self.provider, self.cache, self.stats)
+
+        self.assertEquals(verifier.verify('testmail@gmail.com'), (True, None))
+        self.assertEquals(verifier.verify('TestMail@gmail.com'), (True, None))
+        self.assertEquals(self.provider.verify.call_count, 1)
+        self.assertEquals(self.stats.as_dict()['email'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_verifier_caches_undeliverable_domain(self):
+        verifier = CachedVerifier(self.provider, self.cache, self.stats)
+
+        self.assertEquals(verifier.verify('first@gmadsdkil.invalid'), (False, False))
+        self.assertEquals(verifier.verify('second@gmadsdkil.invalid'), (False, False))
+        self.assertEquals(self.provider.verify.call_count, 1)
+        self.assertEquals(self.stats.as_dict()['domain']['hits'], 1)
+
+    def test_enricher_caches_missing_details(self):
+        self.provider.enrich.return_value = None
+        enricher = CachedEnricher(self.provider, self.cache, self.stats)
+
+        self.assertIsNone(enricher.enrich('testmail@gmail.com'))
+        self.assertIsNone(enricher.enrich('testmail@gmail.com'))
+        self.assertEquals(self.provider.enrich.call_count, 1)
@@ -0,0 +1,72 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..models import Account, Like, Post
+
+
+class TestExport(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = Account.objects.create_user(username='staff', email='staff@gmail.com', password='password',
+                                                 is_staff=True)
+        self.user = Account.objects.create_user(username='user', email='user@gmail.com', password='password')
+        self.posts = [Post.objects.create(post_title='title ' + str(i), post_content='content', author=self.staff)
+                      for i in range(3)]
+        Like.objects.create(related_post=self.posts[0], related_user=self.user)
+
+    def read(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_posts_are_streamed_as_ndjson(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse('export', args=['posts']))
+
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response['Content-Type'], 'application/x-ndjson')
+        rows = self.read(response)
+        self.assertEquals([row['id'] for row in rows], [post.pk for post in self.posts])
+        self.assertEquals(rows[0]['post_title'], 'title 0')
+
+    def test_incremental_gzip_export(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse('export', args=['posts']),
+                                   {'since_pk': self.posts[0].pk, 'compress': 'gzip'})
+
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEquals([row['id'] for row in rows], [post.pk for post in self.posts[1:]])
+
+    def test_accounts_export_has_no_passwords(self):
+        self.client.force_authenticate(self.staff)
+        rows = self.read(self.client.get(reverse('export', args=['accounts'])))
+
+        self.assertEquals([row['username'] for row in rows], ['staff', 'user'])
+        self.assertNotIn('password', rows[0])
+
+    def test_invalid_parameters(self):
+        self.client.force_authenticate(self.staff)
+
+        self.assertEquals(self.client.get(reverse('export', args=['comments'])).status_code, 400)
+        self.assertEquals(self.client.get(reverse('export', args=['likes']), {'since': '2019-01-01'}).status_code,
+                          400)
+        self.assertEquals(self.client.get(reverse('export', args=['posts']), {'since_pk': 'x'}).status_code, 400)
+
+    def test_export_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertEquals(self.client.get(reverse('export', args=['posts'])).status_code, 403)
+
+    def test_export_data_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'likes.ndjson.gz')
+            call_command('export_data', 'likes', gzip=True, output=path)
+            with gzip.open(path) as file:
+                rows = [json.loads(line) for line in file]
+
+        self.assertEquals(rows, [{'id': Like.objects.get().pk, 'related_post_id': self.posts[0].pk,
+                                  'related_user_id': self.user.pk}])
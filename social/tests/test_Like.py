@@ -10,3 +10,8 @@ class TestLikeListViewSet(APITestCase):
     def test_like_list_view_set_GET(self):
         response = self.client.get(self.url)
         self.assertAlmostEquals(response.status_code, 200)
+
+    def test_like_list_view_set_GET_cursor_pagination(self):
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertEquals(response.status_code, 200)
+        self.assertNotIn('count', response.data)
@@ -0,0 +1,186 @@
+import threading
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Account, Like, LikeCounter, Post
+
+
+def counted_likes(kind, object_id):
+    return LikeCounter.objects.filter(kind=kind, object_id=object_id).aggregate(total=Sum('value'))['total'] or 0
+
+
+class TestLikeCounter(TestCase):
+    def setUp(self):
+        self.author = Account.objects.create_user(username='author', email='author@gmail.com', password='password')
+        self.user = Account.objects.create_user(username='user', email='user@gmail.com', password='password')
+        self.post = Post.objects.create(post_title='title', post_content='content', author=self.author)
+        self.url = reverse('posts-detail', args=[self.post.pk])
+
+    def test_like_and_unlike_update_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        client.post(self.url + 'like_post/')
+        client.post(self.url + 'like_post/')
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 1)
+        self.assertEquals(counted_likes(LikeCounter.ACCOUNT, self.user.pk), 1)
+        self.assertEquals(client.get(self.url).data['likes_number'], 1)
+
+        client.delete(self.url + 'unlike_post/')
+        client.delete(self.url + 'unlike_post/')
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 0)
+        self.assertEquals(client.get(self.url).data['likes_number'], 0)
+
+    def test_orm_likes_update_counters(self):
+        like = Like.objects.create(related_post=self.post, related_user=self.user)
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 1)
+
+        like.delete()
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 0)
+
+        Like.objects.create(related_post=self.post, related_user=self.user)
+        self.post.delete()
+        self.assertFalse(LikeCounter.objects.filter(kind=LikeCounter.POST, object_id=self.post.pk).exists())
+
+    def test_moved_likes_update_counters(self):
+        other_post = Post.objects.create(post_title='other', post_content='content', author=self.author)
+        other_user = Account.objects.create_user(username='other', email='other@gmail.com', password='password')
+        like = Like.objects.create(related_post=self.post, related_user=self.user)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch(reverse('likes-detail', args=[like.pk]), {'related_post': other_post.pk})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 0)
+        self.assertEquals(counted_likes(LikeCounter.POST, other_post.pk), 1)
+        self.assertEquals(client.get(self.url).data['likes_number'], 0)
+
+        like.refresh_from_db()
+        like.related_user = other_user
+        like.save()
+        like.save()
+        self.assertEquals(counted_likes(LikeCounter.ACCOUNT, self.user.pk), 0)
+        self.assertEquals(counted_likes(LikeCounter.ACCOUNT, other_user.pk), 1)
+        self.assertEquals(counted_likes(LikeCounter.POST, other_post.pk), 1)
+
+    def test_compact_folds_shards(self):
+        LikeCounter.objects.bulk_create([LikeCounter(kind=LikeCounter.POST, object_id=self.post.pk, shard=shard,
+                                                     value=1) for shard in range(5)])
+        LikeCounter.objects.create(kind=LikeCounter.ACCOUNT, object_id=self.user.pk, shard=3, value=0)
+
+        call_command('compact_like_counters', stdout=open('/dev/null', 'w'))
+
+        self.assertEquals(list(LikeCounter.objects.values_list('kind', 'object_id', 'shard', 'value')),
+                          [(LikeCounter.POST, self.post.pk, 0, 5)])
+
+    def test_rebuild_counts_bulk_created_likes(self):
+        Like.objects.bulk_create([Like(related_post=self.post, related_user=self.user)])
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 0)
+
+        call_command('compact_like_counters', rebuild=True, stdout=open('/dev/null', 'w'))
+
+        self.assertEquals(counted_likes(LikeCounter.POST, self.post.pk), 1)
+        self.assertEquals(counted_likes(LikeCounter.ACCOUNT, self.user.pk), 1)
+
+
+class TestConcurrentLikes(TransactionTestCase):
+    def test_concurrent_likes_are_all_counted(self):
+        author = Account.objects.create_user(username='author', email='author@gmail.com', password='password')
+        post = Post.objects.create(post_title='title', post_content='content', author=author)
+        users = [Account.objects.create_user(username='user' + str(i), email='user@gmail.com', password='password')
+                 for i in range(16)]
+
+        def like(user):
+            try:
+                Like.objects.like(post.pk, user)
+                Like.objects.unlike(post.pk, user)
+                Like.objects.like(post.pk, user)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=like, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEquals(counted_likes(LikeCounter.POST, post.pk), 16)
+        self.assertEquals(Post.objects.with_likes_number().get(pk=post.pk).likes_number, 16)
+
+    def test_compaction_alongside_likes_loses_no_likes(self):
+        authors = [Account.objects.create_user(username='author' + str(i), email='author@gmail.com',
+                                               password='password') for i in range(2)]
+        posts = [Post.objects.create(post_title='title' + str(i), post_content='content', author=author)
+                 for i, author in enumerate(authors)]
+        users = [Account.objects.create_user(username='user' + str(i), email='user@gmail.com', password='password')
+                 for i in range(8)]
+        errors = []
+
+        def like(user):
+            try:
+                for post in posts:
+                    Like.objects.like(post.pk, user)
+                    Like.objects.unlike(post.pk, user)
+                    Like.objects.like(post.pk, user)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        def compact():
+            try:
+                for _ in range(10):
+                    LikeCounter.objects.compact()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=like, args=(user,)) for user in users] + [threading.Thread(target=compact)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEquals(errors, [])
+        for post in posts:
+            self.assertEquals(counted_likes(LikeCounter.POST, post.pk), 8)
+        for user in users:
+            self.assertEquals(counted_likes(LikeCounter.ACCOUNT, user.pk), 2)
+
+
+class TestLikeCounterMigration(TransactionTestCase):
+    before = [('social', '0004_enrichment_job')]
+    after = [('social', '0005_like_counter')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_migration_counts_existing_likes(self):
+        apps = self.migrate(self.before)
+        account_model = apps.get_model('social', 'Account')
+        post_model = apps.get_model('social', 'Post')
+        author = account_model.objects.create(username='author', password='password')
+        users = [account_model.objects.create(username='user' + str(i), password='password') for i in range(2)]
+        posts = [post_model.objects.create(post_title='title' + str(i), author=author) for i in range(2)]
+        like_model = apps.get_model('social', 'Like')
+        like_model.objects.bulk_create([like_model(related_post=post, related_user=user) for post in posts
+                                        for user in users if (post, user) != (posts[1], users[1])])
+
+        counters = self.migrate(self.after).get_model('social', 'LikeCounter').objects
+        self.assertEquals(sorted(counters.values_list('kind', 'object_id', 'shard', 'value')), sorted([
+            (LikeCounter.POST, posts[0].pk, 0, 2), (LikeCounter.POST, posts[1].pk, 0, 1),
+            (LikeCounter.ACCOUNT, users[0].pk, 0, 2), (LikeCounter.ACCOUNT, users[1].pk, 0, 1)]))
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..models import Account, Like, Post
+from ..pagination import KeysetPagination
+
+
+class TestLikers(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = Account.objects.create_user(username='author', email='testmail@gmail.com',
+                                                  password='test_password')
+        self.users = [Account.objects.create_user(username='user {}'.format(i), email='testmail@gmail.com',
+                                                  password='test_password') for i in range(5)]
+        self.posts = [Post.objects.create(post_title='title {}'.format(i), post_content='content', author=self.author)
+                      for i in range(3)]
+        for user in reversed(self.users):
+            Like.objects.create(related_post=self.posts[0], related_user=user)
+        Like.objects.create(related_post=self.posts[2], related_user=self.users[0])
+        Like.objects.create(related_post=self.posts[1], related_user=self.users[0])
+
+    def all_pages(self, url):
+        results = []
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEquals(response.status_code, 200)
+            results.extend(response.data['results'])
+            url = response.data['next']
+        return results
+
+    @mock.patch.object(KeysetPagination, 'page_size', 2)
+    def test_likers_of_post_by_account_id(self):
+        likers = self.all_pages(reverse('posts-likers', args=[self.posts[0].pk]))
+        self.assertEquals([account['username'] for account in likers], [user.username for user in self.users])
+        self.assertNotIn('password', likers[0])
+        self.assertEquals(self.all_pages(reverse('posts-likers', args=[self.posts[1].pk]))[0]['id'], self.users[0].pk)
+
+    @mock.patch.object(KeysetPagination, 'page_size', 2)
+    def test_posts_liked_by_account_by_post_id(self):
+        self.client.force_authenticate(self.users[0])
+        liked = self.all_pages(reverse('accounts-liked', args=[self.users[0].pk]))
+        self.assertEquals([post['id'] for post in liked], [post.pk for post in self.posts])
+        self.assertEquals([post['likes_number'] for post in liked], [5, 1, 1])
+        self.assertTrue(all(post['has_liked'] for post in liked))
+
+    def test_listing_of_missing_object_is_not_found(self):
+        self.assertEquals(self.client.get(reverse('posts-likers', args=[2 ** 31 - 1])).status_code, 404)
+        self.assertEquals(self.client.get(reverse('posts-likers', args=['x'])).status_code, 404)
+        self.assertEquals(self.client.get(reverse('accounts-liked', args=[2 ** 31 - 1])).status_code, 404)
+        response = self.client.get(reverse('accounts-liked', args=[self.author.pk]))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.data['results'], [])
+
+
+class TestHasLiked(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = Account.objects.create_user(username='author', email='testmail@gmail.com',
+                                                  password='test_password')
+        self.user = Account.objects.create_user(username='user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.posts = [Post.objects.create(post_title='title {}'.format(i), post_content='content', author=self.author)
+                      for i in range(3)]
+        Like.objects.create(related_post=self.posts[1], related_user=self.user)
+        self.url = reverse('posts-list')
+
+    def test_has_liked_of_page_is_found_with_one_query(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEquals([post['has_liked'] for post in response.data['results']], [False, True, False])
+
+        Post.objects.create(post_title='title 3', post_content='content', author=self.author)
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {'page': 1})
+
+        response = self.client.get(reverse('posts-detail', args=[self.posts[1].pk]))
+        self.assertTrue(response.data['has_liked'])
+
+    def test_has_liked_is_false_for_anonymous_user(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertFalse(any(post['has_liked'] for post in response.data['results']))
+
+    def test_etag_and_cached_response_are_per_user(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(response.data['results'][1]['has_liked'])
+
+        self.client.force_authenticate(self.author)
+        self.assertEquals(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        response = self.client.get(self.url)
+        self.assertNotEquals(response['ETag'], etag)
+        self.assertFalse(response.data['results'][1]['has_liked'])
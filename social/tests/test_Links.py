@@ -0,0 +1,69 @@
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.reverse import reverse as reverse_url
+from rest_framework.test import APITestCase, APIClient
+
+from ..links import LinkBuilder
+from ..models import Account, Post
+
+
+class TestLinks(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.posts = [Post.objects.create(post_title='title {}'.format(i), post_content='content', author=self.user)
+                      for i in range(3)]
+
+    def test_builder_makes_the_same_links_as_reverse(self):
+        request = Request(RequestFactory().get('/api/posts/'))
+        builder = LinkBuilder(request)
+        for url_name in ('posts-like-post', 'posts-unlike-post', 'posts-detail', 'accounts-read-details',
+                         'accounts-posts'):
+            for pk in (1, 42, 1234567):
+                self.assertEquals(builder.url(url_name, pk), reverse_url(url_name, args=[pk], request=request))
+
+    def test_rows_have_links(self):
+        response = self.client.get(reverse('posts-list'))
+        self.assertEquals(response.status_code, 200)
+        self.assertNotIn('links', response.data)
+        row = response.data['results'][0]
+        self.assertEquals(row['edit_post'], 'http://testserver' + reverse('posts-detail', args=[row['id']]))
+        self.assertEquals(row['like_post'], 'http://testserver' + reverse('posts-like-post', args=[row['id']]))
+
+    def test_link_templates_replace_links_of_rows(self):
+        response = self.client.get(reverse('posts-list'), {'links': 'template'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(list(response.data).index('links'), list(response.data).index('results') - 1)
+
+        template = response.data['links']['edit_post']
+        self.assertEquals(template, 'http://testserver' + reverse('posts-detail', args=['pk']).replace('pk', '{id}'))
+        self.assertEquals(set(response.data['links']), {'like_post', 'unlike_post', 'edit_post'})
+        for row in response.data['results']:
+            self.assertNotIn('edit_post', row)
+            self.assertNotIn('like_post', row)
+            self.assertEquals(template.format(id=row['id']),
+                              'http://testserver' + reverse('posts-detail', args=[row['id']]))
+
+    def test_link_templates_of_selected_fields(self):
+        response = self.client.get(reverse('posts-list'), {'links': 'template', 'fields': 'id,edit_post'})
+        self.assertEquals(set(response.data['links']), {'edit_post'})
+        self.assertEquals(set(response.data['results'][0]), {'id'})
+
+    def test_link_templates_of_accounts(self):
+        response = self.client.get(reverse('accounts-list'), {'links': 'template'})
+        self.assertEquals(response.data['links'],
+                          {'account': 'http://testserver' + reverse('accounts-list') + '{id}/read_details/'})
+        self.assertNotIn('account', response.data['results'][0])
+
+    def test_link_templates_of_account_posts(self):
+        response = self.client.get(reverse('accounts-posts', args=[self.user.pk]), {'links': 'template'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(set(response.data['links']), {'like_post', 'unlike_post', 'edit_post'})
+        self.assertEquals(len(response.data['results']), 3)
+
+    def test_details_keep_links(self):
+        response = self.client.get(reverse('posts-detail', args=[self.posts[0].pk]), {'links': 'template'})
+        self.assertEquals(response.status_code, 200)
+        self.assertIn('edit_post', response.data)
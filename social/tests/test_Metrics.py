@@ -0,0 +1,42 @@
+from django.test import modify_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from .. import metrics
+from ..models import Account, Post
+
+
+@modify_settings(MIDDLEWARE={'prepend': 'social.middleware.MetricsMiddleware'})
+class TestMetricsMiddleware(APITestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        Post.objects.create(post_title='random title', post_content='random content', author=self.user)
+
+    def test_response_has_query_and_timing_headers(self):
+        response = self.client.get(reverse('posts-list'))
+
+        self.assertEquals(response['X-DB-Queries'], '3')
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_reports_routes_in_prometheus_format(self):
+        self.client.get(reverse('posts-list'))
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(reverse('metrics'))
+        content = response.content.decode()
+
+        self.assertEquals(response.status_code, 200)
+        self.assertIn('social_requests_total{route="posts-list",status="200"} 1', content)
+        self.assertIn('social_request_db_queries_bucket{route="posts-list",le="3"} 1', content)
+        self.assertIn('social_metrics_overhead_seconds_count', content)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEquals(response.status_code, 403)
@@ -0,0 +1,70 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..models import Account, Like, Post
+
+
+class TestMultiGet(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.other_user = Account.objects.create_user(username='other_user', email='testmail@gmail.com',
+                                                      password='test_password')
+        self.posts = [Post.objects.create(post_title='title {}'.format(i), post_content='content', author=self.user)
+                      for i in range(4)]
+        Like.objects.create(related_post=self.posts[2], related_user=self.other_user)
+
+    def ids(self, *pks):
+        return {'ids': ','.join(str(pk) for pk in pks)}
+
+    def test_posts_in_requested_order_with_one_query(self):
+        pks = [self.posts[2].pk, self.posts[0].pk, self.posts[3].pk]
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('posts-list'), self.ids(*pks))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([post['id'] for post in response.data['results']], pks)
+        self.assertEquals(response.data['results'][0]['likes_number'], 1)
+        self.assertEquals(response.data['results'][0]['author'], 'test_user')
+        self.assertEquals(response.data['missing'], [])
+
+    def test_missing_ids_are_reported(self):
+        response = self.client.get(reverse('posts-list'), self.ids(2 ** 31 - 1, self.posts[1].pk, self.posts[1].pk))
+        self.assertEquals([post['id'] for post in response.data['results']], [self.posts[1].pk])
+        self.assertEquals(response.data['missing'], [2 ** 31 - 1])
+
+    def test_posts_response_is_conditional(self):
+        response = self.client.get(reverse('posts-list'), self.ids(self.posts[0].pk))
+        response = self.client.get(reverse('posts-list'), self.ids(self.posts[0].pk),
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, 304)
+
+    def test_selected_fields(self):
+        response = self.client.get(reverse('posts-list'), dict(self.ids(self.posts[0].pk), fields='id,post_title'))
+        self.assertEquals(response.data['results'], [{'id': self.posts[0].pk, 'post_title': 'title 0'}])
+
+    def test_accounts_with_details(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('accounts-list'), self.ids(self.other_user.pk, self.user.pk))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([account['username'] for account in response.data['results']], ['other_user', 'test_user'])
+        self.assertEquals(response.data['results'][0]['likes_number'], 1)
+        self.assertEquals(len(response.data['results'][1]['posts']), 4)
+        self.assertNotIn('user_details', response.data['results'][0])
+
+    def test_accounts_do_not_show_passwords(self):
+        response = self.client.get(reverse('accounts-list'), self.ids(self.user.pk, self.other_user.pk))
+        for account in response.data['results']:
+            self.assertNotIn('password', account)
+        response = self.client.get(reverse('accounts-read-details', args=[self.user.pk]))
+        self.assertNotIn('password', response.data)
+        self.assertNotIn(b'pbkdf2', response.content)
+
+    @override_settings(MULTI_GET_MAX_IDS=2)
+    def test_invalid_ids_are_rejected(self):
+        for ids in ('', '1,x', '0', '1,2,3', '99999999999'):
+            response = self.client.get(reverse('posts-list'), {'ids': ids})
+            self.assertEquals(response.status_code, 400)
+        response = self.client.get(reverse('accounts-list'), {'ids': '1,2,3'})
+        self.assertEquals(response.status_code, 400)
@@ -1,5 +1,7 @@
 import json
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 
@@ -100,3 +102,81 @@ class TestPostListViewSet(APITestCase):
         response = self.client.get(self.url + str(post.pk) + '/unlike_post/')
 
         self.assertEquals(response.status_code, 405)
+
+    def test_post_list_query_count_does_not_depend_on_number_of_posts(self):
+        post = Post.objects.create(post_title='first title', post_content='content', author=self.user)
+        Like.objects.create(related_post=post, related_user=self.second_user)
+        with CaptureQueriesContext(connection) as one_post:
+            self.client.get(self.url)
+
+        for i in range(10):
+            post = Post.objects.create(post_title='title ' + str(i), post_content='content', author=self.second_user)
+            Like.objects.create(related_post=post, related_user=self.user)
+        with CaptureQueriesContext(connection) as many_posts:
+            response = self.client.get(self.url)
+
+        self.assertEquals(response.data['count'], 11)
+        self.assertEquals(response.data['results'][0]['likes_number'], 1)
+        self.assertEquals(len(one_post), len(many_posts))
+
+    def test_post_list_cursor_pagination(self):
+        Post.objects.bulk_create(
+            [Post(post_title='title ' + str(i), post_content='content', author=self.user) for i in range(45)])
+
+        first_page = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertEquals(first_page.status_code, 200)
+        self.assertNotIn('count', first_page.data)
+        self.assertEquals(len(first_page.data['results']), 40)
+
+        second_page = self.client.get(first_page.data['next'])
+        self.assertEquals(len(second_page.data['results']), 5)
+        self.assertIsNone(second_page.data['next'])
+
+        ids = [post['id'] for post in first_page.data['results'] + second_page.data['results']]
+        self.assertEquals(sorted(ids), sorted(Post.objects.values_list('pk', flat=True)))
+
+    def test_like_post_POST_runs_single_query(self):
+        post = Post.objects.create(post_title='random title', post_content='Different content', author=self.second_user)
+        self.client.force_authenticate(self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url + str(post.pk) + '/like_post/')
+
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(response.data['related_post'], post.pk)
+        self.assertTrue(Like.objects.filter(related_post=post, related_user=self.user).exists())
+
+    def test_unlike_post_DELETE_runs_single_query(self):
+        post = Post.objects.create(post_title='random title', post_content='Different content', author=self.second_user)
+        Like.objects.create(related_post=post, related_user=self.user)
+        self.client.force_authenticate(self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.delete(self.url + str(post.pk) + '/unlike_post/')
+
+        self.assertEquals(response.status_code, 200)
+        self.assertFalse(Like.objects.filter(related_post=post, related_user=self.user).exists())
+
+    def test_like_post_that_does_not_exist(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url + '12345/like_post/')
+
+        self.assertEquals(response.status_code, 404)
+
+    def test_post_list_sparse_fields_skip_likes_and_links(self):
+        post = Post.objects.create(post_title='random title', post_content='Different content', author=self.second_user)
+        Like.objects.create(related_post=post, related_user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,post_title'})
+
+        self.assertEquals(response.data['results'], [{'id': post.pk, 'post_title': 'random title'}])
+        self.assertNotIn('social_likecounter', queries[-1]['sql'])
+        self.assertNotIn('post_content', queries[-1]['sql'])
+
+        response = self.client.get(self.url + str(post.pk) + '/', {'omit': 'like_post,unlike_post,edit_post'})
+        self.assertEquals(set(response.data), {'id', 'post_title', 'post_content', 'author', 'likes_number',
+                                               'has_liked'})
+        self.assertEquals(response.data['likes_number'], 1)
+
+        self.assertEquals(self.client.get(self.url, {'fields': 'id,password'}).status_code, 400)
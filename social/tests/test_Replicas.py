@@ -0,0 +1,159 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .. import routers
+from ..models import Account, Post
+from ..routers import ReplicaHealth, ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_MAX_LAG_SECONDS=2, REPLICA_LAG_CHECK_SECONDS=1)
+class TestReplicaRouter(SimpleTestCase):
+    def setUp(self):
+        routers.replica_health.reset()
+        self.router = ReplicaRouter()
+
+    def tearDown(self):
+        routers.stop_routing()
+        routers.replica_health.reset()
+
+    def test_reads_outside_of_requests_go_to_default(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+        self.assertEquals(self.router.db_for_write(Post), 'default')
+
+    @mock.patch('social.routers.replica_lag', return_value=0.5)
+    def test_reads_of_request_go_to_replica(self, replica_lag):
+        routers.start_routing(True)
+        self.assertEquals(self.router.db_for_read(Post), 'replica')
+        self.assertEquals(self.router.db_for_read(Account), 'replica')
+        self.assertEquals(self.router.db_for_write(Post), 'default')
+        self.assertEquals(replica_lag.call_count, 1)
+
+    @mock.patch('social.routers.replica_lag', return_value=5)
+    def test_lagging_replica_is_not_used(self, replica_lag):
+        routers.start_routing(True)
+        self.assertEquals(self.router.db_for_read(Post), 'default')
+
+    @mock.patch('social.routers.replica_lag', return_value=None)
+    def test_unreachable_replica_is_not_used(self, replica_lag):
+        routers.start_routing(True)
+        self.assertEquals(self.router.db_for_read(Post), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'social'))
+        self.assertIsNone(self.router.allow_migrate('default', 'social'))
+
+    def test_lag_is_checked_at_most_once_per_interval(self):
+        clock = FakeClock()
+        health = ReplicaHealth(clock)
+        with mock.patch('social.routers.replica_lag', return_value=0) as replica_lag:
+            self.assertEquals(health.healthy(['replica']), ['replica'])
+            clock.now = 0.5
+            self.assertEquals(health.healthy(['replica']), ['replica'])
+            self.assertEquals(replica_lag.call_count, 1)
+
+        with mock.patch('social.routers.replica_lag', return_value=3) as replica_lag:
+            clock.now = 1.5
+            self.assertEquals(health.healthy(['replica']), [])
+            self.assertEquals(replica_lag.call_count, 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestReadYourWrites(TransactionTestCase):
+    """replica alias mirrors default test database, so it sees only committed rows"""
+
+    def setUp(self):
+        routers.replica_health.reset()
+        caches['default'].clear()
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+        self.other_user = Account.objects.create_user(username='other_user', email='testmail@gmail.com',
+                                                      password='test_password')
+        self.post = Post.objects.create(post_title='title', post_content='content', author=self.other_user)
+
+    def tearDown(self):
+        routers.replica_health.reset()
+
+    def get(self, url, user=None):
+        """Returns response, and numbers of queries to default and replica"""
+
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(user)))
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get(url)
+        return response, len(default), len(replica)
+
+    def test_safe_requests_read_from_replica(self):
+        response, default, replica = self.get(reverse('posts-list'))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(default, 0)
+        self.assertGreater(replica, 0)
+
+    def test_user_reads_from_default_after_write(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(self.user)))
+        response = client.post(reverse('posts-like-post', args=[self.post.pk]))
+        self.assertEquals(response.status_code, 201)
+
+        response, default, replica = self.get(reverse('posts-detail', args=[self.post.pk]), self.user)
+        self.assertEquals(response.data['likes_number'], 1)
+        self.assertGreater(default, 0)
+        self.assertEquals(replica, 0)
+
+        response, default, replica = self.get(reverse('posts-detail', args=[self.post.pk]), self.other_user)
+        self.assertEquals(default, 0)
+        self.assertGreater(replica, 0)
+
+    def test_user_reads_from_default_after_like_with_get(self):
+        response, default, replica = self.get(reverse('posts-like-post', args=[self.post.pk]), self.user)
+        self.assertEquals(response.status_code, 201)
+
+        response, default, replica = self.get(reverse('posts-detail', args=[self.post.pk]), self.user)
+        self.assertEquals(response.data['likes_number'], 1)
+        self.assertEquals(replica, 0)
+
+    def test_reads_after_write_of_safe_request_go_to_default(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(self.user)))
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get(reverse('posts-like-post', args=[self.post.pk + 1]))
+
+        self.assertEquals(response.status_code, 404)
+        # user is authenticated from replica, but post is looked up after attempted like
+        self.assertFalse([query for query in replica.captured_queries if Post._meta.db_table in query['sql']])
+
+    def test_session_user_reads_from_default_after_write(self):
+        client = APIClient()
+        client.login(username='test_user', password='test_password')
+        response = client.post(reverse('posts-list'), {'post_title': 'new title', 'post_content': 'content'})
+        self.assertEquals(response.status_code, 201)
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get(reverse('posts-list'))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(replica), 0)
+
+    def test_primary_has_no_lag(self):
+        self.assertEquals(routers.replica_lag('default'), 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_reads_from_default(self):
+        response, default, replica = self.get(reverse('posts-list'))
+        self.assertGreater(default, 0)
+        self.assertEquals(replica, 0)
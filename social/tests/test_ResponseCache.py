@@ -0,0 +1,66 @@
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..conditional import response_cache_stats
+from ..models import Account, Post
+
+
+class TestResponseCache(APITestCase):
+    def setUp(self):
+        caches['responses'].clear()
+        response_cache_stats.reset()
+        self.client = APIClient()
+        self.author = Account.objects.create_user(username='author', email='author@gmail.com', password='password')
+        self.user = Account.objects.create_user(username='user', email='user@gmail.com', password='password')
+        self.post = Post.objects.create(post_title='title', post_content='content', author=self.author)
+        self.url = reverse('posts-list')
+
+    def test_cached_list_is_served_with_single_query(self):
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+
+        self.assertEquals(first.data, second.data)
+        self.assertEquals(response_cache_stats.as_dict()['posts-list'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_like_is_never_served_stale(self):
+        post_url = reverse('posts-detail', args=[self.post.pk])
+        details_url = reverse('accounts-read-details', args=[self.user.pk])
+        for url in (self.url, post_url, details_url):
+            self.client.get(url)
+
+        self.client.force_authenticate(self.user)
+        self.client.post(post_url + 'like_post/')
+        self.client.force_authenticate(None)
+
+        self.assertEquals(self.client.get(self.url).data['results'][0]['likes_number'], 1)
+        self.assertEquals(self.client.get(post_url).data['likes_number'], 1)
+        self.assertEquals(self.client.get(details_url).data['likes_number'], 1)
+
+    def test_author_rename_is_never_served_stale(self):
+        post_url = reverse('posts-detail', args=[self.post.pk])
+        self.client.get(post_url)
+
+        self.author.username = 'renamed'
+        self.author.save()
+
+        self.assertEquals(self.client.get(post_url).data['author'], 'renamed')
+        self.assertEquals(self.client.get(self.url).data['results'][0]['author'], 'renamed')
+
+    def test_hosts_are_cached_separately(self):
+        self.client.get(self.url, HTTP_HOST='localhost')
+        response = self.client.get(self.url, HTTP_HOST='testserver')
+
+        self.assertTrue(response.data['results'][0]['like_post'].startswith('http://testserver/'))
+        self.assertEquals(response_cache_stats.as_dict()['posts-list']['hits'], 0)
+
+    def test_pages_are_cached_separately(self):
+        Post.objects.create(post_title='second', post_content='content', author=self.author)
+
+        self.client.get(self.url)
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+
+        self.assertNotIn('count', response.data)
+        self.assertEquals(response_cache_stats.as_dict()['posts-list']['hits'], 0)
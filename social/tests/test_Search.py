@@ -0,0 +1,49 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from ..models import Account, Post
+
+
+class TestPostSearch(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('posts-search')
+        self.user = Account.objects.create_user(username='test_user', email='testmail@gmail.com',
+                                                password='test_password')
+
+    def test_title_matches_rank_above_content_matches(self):
+        Post.objects.create(post_title='Cooking', post_content='Gardening tips for tomatoes', author=self.user)
+        Post.objects.create(post_title='Gardening in spring', post_content='Planting', author=self.user)
+        Post.objects.create(post_title='Football', post_content='Match report', author=self.user)
+
+        response = self.client.get(self.url, {'q': 'gardens'})
+
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([post['post_title'] for post in response.data['results']], ['Gardening in spring', 'Cooking'])
+
+    def test_search_vector_follows_edits(self):
+        post = Post.objects.create(post_title='Cooking', post_content='Pasta', author=self.user)
+        post.post_content = 'Risotto'
+        post.save()
+
+        self.assertEquals(len(self.client.get(self.url, {'q': 'pasta'}).data['results']), 0)
+        self.assertEquals(len(self.client.get(self.url, {'q': 'risotto'}).data['results']), 1)
+
+    def test_keyset_pages_cover_all_results_once(self):
+        Post.objects.bulk_create(
+            [Post(post_title='post ' + str(i), post_content='keyword ' * (i % 4 + 1), author=self.user)
+             for i in range(95)])
+
+        ids = []
+        response = self.client.get(self.url, {'q': 'keyword'})
+        while True:
+            ids.extend(post['id'] for post in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEquals(sorted(ids), sorted(Post.objects.values_list('pk', flat=True)))
+
+    def test_query_is_required(self):
+        self.assertEquals(self.client.get(self.url).status_code, 400)
+        self.assertEquals(self.client.get(self.url, {'q': 'x', 'cursor': 'invalid'}).status_code, 404)
@@ -15,6 +15,8 @@ urlpatterns = [
     path('token', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify', TokenVerifyView.as_view(), name='token_verify'),
+    path('metrics', views.MetricsView.as_view(), name='metrics'),
+    path('export/<str:kind>', views.ExportView.as_view(), name='export'),
     path('', include(router.urls)),
     path('docs', include(('rest_framework.urls', 'api'), namespace='social')),
 ]
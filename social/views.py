@@ -1,106 +1,380 @@
-import clearbit
+from collections import OrderedDict
+
 from django.conf import settings
-from pyhunter import PyHunter
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .exceptions import EmailDoNotExists
-from .models import Account, Post, Like
+from . import bulk, export, metrics
+from .authentication import user_cache_stats
+from .conditional import ConditionalGetMixin, response_cache_stats
+from .links import wants_link_templates, with_link_templates
+from .models import Account, EnrichmentJob, Post, Like, VersionStamp, only_fields
+from .pagination import KeysetPagination, RankedKeysetPagination
 from .permisions import IsOwnerOrReadOnlyPost
-from .serializers import AccountListSerializer, PostSerializer, LikeSerializer, AccountDetailsSerializer
+from .serializers import AccountListSerializer, PostSerializer, LikeSerializer, AccountDetailsSerializer, selected_fields
+
+
+class LinkTemplatesMixin:
+    """With ?links=template, paginated responses carry URI templates of serializer's link fields once,
+    in links of the envelope, and rows carry only ids instead of links"""
+
+    link_templates = False
+
+    def paginate_queryset(self, queryset):
+        page = super(LinkTemplatesMixin, self).paginate_queryset(queryset)
+        self.link_templates = page is not None and wants_link_templates(self.request)
+        return page
+
+    def get_serializer_context(self):
+        context = super(LinkTemplatesMixin, self).get_serializer_context()
+        context['link_templates'] = self.link_templates
+        return context
+
+    def get_paginated_response(self, data):
+        response = super(LinkTemplatesMixin, self).get_paginated_response(data)
+        if self.link_templates:
+            serializer_class = self.get_serializer_class()
+            fields = selected_fields(self.request, serializer_class)
+            link_fields = {field: url_name for field, url_name in serializer_class.link_fields.items()
+                           if fields is None or field in fields}
+            response.data = with_link_templates(response.data, link_fields, self.get_serializer_context())
+        return response
+
+
+def parse_ids(value):
+    """Returns unique ids from comma separated value, in given order, or raises 400 if they are not valid ids,
+    or there are more than MULTI_GET_MAX_IDS of them"""
+
+    ids = []
+    seen = set()
+    for part in value.split(','):
+        try:
+            pk = int(part)
+        except ValueError:
+            raise ValidationError({'ids': 'ids must be comma separated integers'})
+        if not 0 < pk < 2 ** 31:
+            raise ValidationError({'ids': 'Invalid id {}'.format(part)})
+        if pk not in seen:
+            seen.add(pk)
+            ids.append(pk)
+    if len(ids) > settings.MULTI_GET_MAX_IDS:
+        raise ValidationError({'ids': 'At most {} ids can be requested'.format(settings.MULTI_GET_MAX_IDS)})
+    return ids
+
+
+def in_order(queryset, pks):
+    """Returns objects of queryset with given pks, in order of pks"""
+
+    objects = queryset.in_bulk(pks)
+    return [objects[pk] for pk in pks if pk in objects]
+
+
+class MultiGetMixin:
+    """With ?ids=1,2,3, list returns objects with those ids, in requested order, loaded with one query,
+    and ids which were not found in missing, instead of paginated list.
+    Responses are conditional on multi_get_version_key, if view sets it"""
+
+    multi_get_version_key = None
 
+    def list(self, request, *args, **kwargs):
+        if 'ids' not in request.query_params:
+            return super(MultiGetMixin, self).list(request, *args, **kwargs)
 
-class AccountListViewSet(viewsets.ModelViewSet):
+        ids = parse_ids(request.query_params['ids'])
+        if self.multi_get_version_key is None:
+            return self.multi_get_response(request, ids)
+        return self.conditional_response(self.multi_get_version_key, self.multi_get_response, request, ids)
+
+    def multi_get_response(self, request, ids):
+        objects = in_order(self.get_multi_get_queryset(), ids)
+        found = {obj.pk for obj in objects}
+        serializer = self.get_multi_get_serializer(objects)
+        return Response(OrderedDict([('results', serializer.data),
+                                     ('missing', [pk for pk in ids if pk not in found])]))
+
+    def get_multi_get_queryset(self):
+        return self.get_queryset()
+
+    def get_multi_get_serializer(self, objects):
+        return self.get_serializer(objects, many=True)
+
+
+def valid_pk(value):
+    """Returns pk from url, or raises 404 if it is not a valid id"""
+
+    try:
+        pk = int(value)
+    except ValueError:
+        raise Http404
+    if not 0 < pk < 2 ** 31:
+        raise Http404
+    return pk
+
+
+def wants_user_details(request):
+    return 'user_details' in request.query_params.get('include', '').split(',')
+
+
+class AccountListViewSet(MultiGetMixin, ConditionalGetMixin, LinkTemplatesMixin, viewsets.ModelViewSet):
     queryset = Account.objects.all().order_by('id')
     serializer_class = AccountListSerializer
+    cursor_ordering = 'pk'
+    collection_version_key = VersionStamp.ACCOUNTS
+    object_version_key = staticmethod(VersionStamp.account_key)
+    cached_actions = ('read_details',)
+
+    def get_serializer_class(self):
+        if self.action in ('posts', 'liked'):
+            return PostSerializer
+        return super(AccountListViewSet, self).get_serializer_class()
+
+    def get_queryset(self):
+        """Loads only columns of fields selected with ?fields= or ?omit="""
+        fields = selected_fields(self.request, AccountListSerializer)
+        queryset = super(AccountListViewSet, self).get_queryset()
+        return queryset if fields is None else only_fields(queryset, fields)
+
+    def get_multi_get_queryset(self):
+        """Accounts are requested by ids to show their details, with likes numbers and titles of recent posts"""
+        fields = selected_fields(self.request, AccountDetailsSerializer)
+        return Account.objects.with_details(wants_user_details(self.request), fields)
+
+    def get_multi_get_serializer(self, objects):
+        return AccountDetailsSerializer(objects, many=True, context=self.get_serializer_context(),
+                                        include_user_details=wants_user_details(self.request))
 
     def perform_create(self, serializer):
-        """Check if user is bot, and if it is not, use pyhunter to validate email, and use clearbit to enrich user data """
+        """Check if user is bot, and if it is not, queue job that validates email and enriches user data.
+        Job is run by enrichment_worker command, so sign up does not wait for pyhunter and clearbit"""
 
         user = serializer.save()
         bot = self.request.query_params.get('bot', '')
-        if not bot:
-
-            # NOTE if it is not working, it is because i have reached the limit for the number of verification requests per domain
-            # to solve it temporarily, just change email domain to a different one
-            if not self.check_if_mail_is_valid(user.email):
-                raise EmailDoNotExists()
-
-            clearbit.key = settings.CLEARBIT_KEY
-            user.user_details = clearbit.Enrichment.find(email=user.email, stream=True)
 
         user.set_password(user.password)
+        if not bot:
+            user.enrichment_status = Account.ENRICHMENT_PENDING
 
-        user.save()
+        with transaction.atomic():
+            user.save()
+            if not bot:
+                EnrichmentJob.objects.create(account=user)
 
     @action(detail=True)
     def read_details(self, request, pk=None):
-        """Display full user details"""
-        queryset = Account.objects.get(pk=pk)
-        serializer = AccountDetailsSerializer(queryset, context={'request': request})
+        """Display full user details, with titles of most recent posts.
+        User details are loaded and shown only with ?include=user_details"""
+        return self.conditional_response(self.get_object_version_key(), self.details_response, request, pk)
+
+    def details_response(self, request, pk):
+        include_user_details = wants_user_details(request)
+        fields = selected_fields(request, AccountDetailsSerializer)
+        queryset = get_object_or_404(Account.objects.with_details(include_user_details, fields), pk=valid_pk(pk))
+        serializer = AccountDetailsSerializer(queryset, context={'request': request},
+                                              include_user_details=include_user_details)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    def check_if_mail_is_valid(self, email):
-        """Uses pyhunter to check if email is valid
-        Return True if it is, and False if it is not valid"""
-        hunter = PyHunter(api_key=settings.HUNTER_API_KEY)
-        try:
-            data = hunter.email_verifier(email)
-            print(data)
-            if data['result'] == 'undeliverable':
-                return False
-            return True
-        except:
-            return False
+    @action(detail=True)
+    def posts(self, request, pk=None):
+        """Paginated list of all posts of account, most recent first"""
+        user_pk = valid_pk(pk)
+        if not Account.objects.filter(pk=user_pk).exists():
+            raise Http404
+
+        # keyset pagination follows the same order as page number pagination
+        self.cursor_ordering = '-date_time_created'
+        queryset = Post.objects.filter(author_id=user_pk).with_fields(selected_fields(request, PostSerializer))
+        queryset = queryset.order_by('-date_time_created', '-pk')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
+    @action(detail=True, pagination_class=KeysetPagination)
+    def liked(self, request, pk=None):
+        """Posts liked by account, with keyset pagination by post id.
+        Page is read from index of likes (related_user, related_post) only, and its posts are loaded by pk"""
+        user_pk = valid_pk(pk)
+        self.cursor_ordering = 'related_post_id'
+        page = self.paginate_queryset(Like.objects.filter(related_user_id=user_pk).values('related_post_id'))
+        if not page and not Account.objects.filter(pk=user_pk).exists():
+            raise Http404
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().order_by('pk')
+        queryset = Post.objects.with_fields(selected_fields(request, PostSerializer))
+        posts = in_order(queryset, [like['related_post_id'] for like in page])
+        serializer = self.get_serializer(posts, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PostViewSet(MultiGetMixin, ConditionalGetMixin, LinkTemplatesMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.order_by('pk')
     serializer_class = PostSerializer
+    cursor_ordering = '-date_time_created'
+    collection_version_key = VersionStamp.POSTS
+    multi_get_version_key = VersionStamp.POSTS
+    object_version_key = staticmethod(VersionStamp.post_key)
+    # post shows username of its author
+    object_related_version_keys = staticmethod(VersionStamp.post_author_keys)
+    cached_actions = ('list', 'retrieve')
+    # has_liked depends on user
+    cache_per_user = True
+
+    def get_serializer_class(self):
+        if self.action == 'likers':
+            return AccountListSerializer
+        return super(PostViewSet, self).get_serializer_class()
+
+    def get_queryset(self):
+        """Loads only columns of fields selected with ?fields= or ?omit=, and counts likes only if they are selected"""
+        fields = selected_fields(self.request, PostSerializer)
+        return super(PostViewSet, self).get_queryset().with_fields(fields)
     permission_classes = (permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnlyPost)
 
-    @action(detail=True)
+    @action(detail=True, methods=['get', 'post'])
     def like_post(self, request, pk=None):
         """Function for post liking.
-        Creates like, if user is authenticated, is not owner of the post, and if he is not already liked this post, else displays error."""
-        post = self.get_object()
-        if post.author == request.user:
-            return Response({'error': 'You can not like your own post'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
-
+        Creates like, if user is authenticated, is not owner of the post, and if he is not already liked this post, else displays error.
+        Like is created with single statement, without loading the post"""
         if request.user.is_anonymous:
             return Response({'error': 'You must be logged in !'}, status=status.HTTP_401_UNAUTHORIZED)
-        like, created = Like.objects.get_or_create(related_post=post, related_user=request.user)
 
-        if not created:
-            return Response({'error': 'Already liked this post'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        like = Like.objects.like(self.get_post_pk(), request.user)
+        if like is None:
+            return self.like_error(request.user, 'You can not like your own post', 'Already liked this post')
 
         serializer = LikeSerializer(like, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    @action(detail=True)
+    @action(detail=True, methods=['get', 'delete'])
     def unlike_post(self, request, pk=None):
         """Function for post unliking.
-                Deletes like, if user is authenticated, is not owner of the post, and if he already liked this post, else displays error."""
-        post = self.get_object()
+                Deletes like, if user is authenticated, is not owner of the post, and if he already liked this post, else displays error.
+                Like is deleted with single statement, without loading the post"""
         user = request.user
         if user.is_anonymous:
             return Response({'error': 'You must be logged in !'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if post.author == user:
-            return Response({'error': 'You can not unlike your own post'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        like = Like.objects.unlike(self.get_post_pk(), user)
+        if like is None:
+            return self.like_error(user, 'You can not unlike your own post',
+                                   'You did not liked this post, you can not unlike it')
+
+        serializer = LikeSerializer(like, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, pagination_class=KeysetPagination)
+    def likers(self, request, pk=None):
+        """Accounts which liked the post, with keyset pagination by account id.
+        Page is read from index of likes (related_post, related_user) only, and its accounts are loaded by pk"""
+        post_pk = self.get_post_pk()
+        self.cursor_ordering = 'related_user_id'
+        page = self.paginate_queryset(Like.objects.filter(related_post_id=post_pk).values('related_user_id'))
+        if not page and not Post.objects.filter(pk=post_pk).exists():
+            raise Http404
+
+        fields = selected_fields(request, AccountListSerializer)
+        queryset = Account.objects.all() if fields is None else only_fields(Account.objects.all(), fields)
+        accounts = in_order(queryset, [like['related_user_id'] for like in page])
+        serializer = self.get_serializer(accounts, many=True)
+        return self.get_paginated_response(serializer.data)
 
-        if Like.objects.filter(related_post=post, related_user=user).exists():
-            like = Like.objects.get(related_post=post, related_user=user)
-            like.delete()
-            serializer = LikeSerializer(like, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Creates up to BULK_MAX_ITEMS posts, given as JSON array, in one transaction.
+        Returns result of every item, with 207 status if some of them were not created"""
+        items = bulk.parse_items(request)
+        return bulk.bulk_response(bulk.create_posts(items, request.user, self.get_serializer_context()))
 
-        return Response({'error': 'You did not liked this post, you can not unlike it'},
-                        status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    @action(detail=False, pagination_class=RankedKeysetPagination)
+    def search(self, request):
+        """Full text search of posts' titles and contents, ranked by relevance, with keyset pagination.
+        Matching posts are found with GIN index of stored search vector"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'Search query is required'})
+
+        page = self.paginate_queryset(self.get_queryset().search(text))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_post_pk(self):
+        """Returns pk of the post from url, or raises 404 if it is not a valid id"""
+
+        return valid_pk(self.kwargs[self.lookup_field])
+
+    def like_error(self, user, own_post_error, error):
+        """Explains why like or unlike did not change anything. Raises 404 if the post does not exist"""
+
+        author_pk = Post.objects.filter(pk=self.get_post_pk()).values_list('author_id', flat=True).first()
+        if author_pk is None:
+            raise Http404
+        if author_pk == user.pk:
+            return Response({'error': own_post_error}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        return Response({'error': error}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
 class LikeViewSet(viewsets.ModelViewSet):
-    queryset = Like.objects.all().order_by('pk')
+    queryset = Like.objects.order_by('pk')
     serializer_class = LikeSerializer
+    cursor_ordering = 'pk'
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+
+    def get_queryset(self):
+        """Loads only columns of fields selected with ?fields= or ?omit=, and joins user only if it is selected"""
+        fields = selected_fields(self.request, LikeSerializer)
+        queryset = super(LikeViewSet, self).get_queryset()
+        if fields is None:
+            return queryset.select_related('related_user')
+        if 'related_user' in fields:
+            queryset = queryset.select_related('related_user')
+            fields = fields | {'related_user__username'}
+        return only_fields(queryset, fields)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Likes up to BULK_MAX_ITEMS posts, given as JSON array of {"related_post": id}, with single statement.
+        Returns result of every item, with 207 status if some posts were not liked"""
+        items = bulk.parse_items(request)
+        return bulk.bulk_response(bulk.like_posts(items, request.user, self.get_serializer_context()))
+
+
+class MetricsView(APIView):
+    """Per-route request metrics, recorded by MetricsMiddleware, and response and user cache hits and misses,
+    in Prometheus text format. Available to staff only"""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        content = metrics.registry.to_prometheus() + metrics.cache_stats_to_prometheus(
+            'social_response_cache', response_cache_stats) + metrics.cache_stats_to_prometheus(
+            'social_user_cache', user_cache_stats)
+        return HttpResponse(content, content_type='text/plain; version=0.0.4')
+
+
+class ExportView(APIView):
+    """Streams all posts, likes or accounts as NDJSON, one object per line, with constant memory.
+    since_pk and since (ISO 8601) query parameters limit export to newer rows, and compress=gzip compresses it.
+    Available to staff only"""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, kind):
+        compress = request.query_params.get('compress') == 'gzip'
+        try:
+            since_pk = request.query_params.get('since_pk')
+            since_pk = int(since_pk) if since_pk else None
+            since = request.query_params.get('since')
+            since = export.parse_since(since) if since else None
+            chunks = export.export(kind, since_pk, since, compress)
+        except ValueError as error:
+            raise ValidationError({'error': str(error)})
+
+        filename = kind + ('.ndjson.gz' if compress else '.ndjson')
+        content_type = 'application/gzip' if compress else 'application/x-ndjson'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        return response
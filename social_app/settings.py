@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'social',
     'rest_framework',
 
@@ -47,10 +48,16 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'social.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# To record per-route query counts and timings, exposed at /api/metrics,
+# add 'social.middleware.MetricsMiddleware' at the start of MIDDLEWARE.
+# Requests slower than this many seconds are logged with their SQL
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+
 ROOT_URLCONF = 'social_app.urls'
 
 TEMPLATES = [
@@ -85,6 +92,72 @@ DATABASES = {
     }
 }
 
+# Local stand-in for read replica, the same database as default. Point it at streaming replica of default,
+# and list it in DATABASE_REPLICAS, to send reads of safe requests to it. Tests use default's test database
+DATABASES['replica'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['social.routers.ReplicaRouter']
+
+# Aliases of read replicas, used by ReplicaRouter and ReplicaMiddleware. Empty sends everything to default
+DATABASE_REPLICAS = []
+# Seconds for which user reads from default after a write request
+REPLICA_PIN_SECONDS = 5
+# Cache alias of users pinned to default. Use shared cache when running more than one process
+REPLICA_PIN_CACHE = 'default'
+# Replicas which lag more than this many seconds are not read from
+REPLICA_MAX_LAG_SECONDS = 2
+# Seconds between checks of replication lag, per replica and process
+REPLICA_LAG_CHECK_SECONDS = 1
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # snapshots of users authenticated by JWT, evicted least recently used first
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # serialized responses, evicted least recently used first. Use FileBasedCache to share it between processes
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+# Cache alias of users authenticated by JWT, or None to load user on every request
+JWT_USER_CACHE = 'users'
+
+# Cache alias of posts and account details responses, or None to disable response caching
+RESPONSE_CACHE = 'responses'
+
+# Maximum number of items of bulk posts and likes requests
+BULK_MAX_ITEMS = 100
+
+# Maximum number of ids of posts and accounts requested with ?ids=
+MULTI_GET_MAX_IDS = 100
+
+# Number of most recent post titles embedded in account details
+ACCOUNT_RECENT_POSTS = 10
+
+# Number of shards of every like counter. More shards let more likes of the same post run in parallel,
+# and make reading the count sum more rows
+LIKE_COUNTER_SHARDS = 8
+
+# Number of shards of every version stamp, which are bumped on every post, account and like change
+VERSION_STAMP_SHARDS = 8
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -122,14 +195,30 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'social.pagination.PageNumberOrKeysetPagination',
     'PAGE_SIZE': 40,
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'social.authentication.CachedJWTAuthentication',
     )
 }
 CLEARBIT_KEY = 'sk_d87203c31845b8e54c415a9dea4ca251'
 HUNTER_API_KEY = '06edcc5690e19d1b912e2a34dd75b487b19b1b7e'
 
+# Email verification and enrichment providers, used by enrichment_worker command.
+# Use social.enrichment.FakeProvider for both to run offline
+ENRICHMENT_VERIFIER = 'social.enrichment.HunterVerifier'
+ENRICHMENT_ENRICHER = 'social.enrichment.ClearbitEnricher'
+# cache alias for verification and enrichment results, or None to call providers every time
+ENRICHMENT_CACHE = 'default'
+# seconds to keep deliverable emails and their details, verdicts for whole domains, and undeliverable emails
+ENRICHMENT_CACHE_TTL = {
+    'email': 7 * 24 * 60 * 60,
+    'domain': 24 * 60 * 60,
+    'negative': 60 * 60,
+}
+ENRICHMENT_MAX_ATTEMPTS = 5
+# seconds after which running job, whose worker stopped, is claimed again
+ENRICHMENT_JOB_TIMEOUT = 300
+
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver']